@@ -0,0 +1,121 @@
+"""
+Run the SAM2 image encoder through ONNX Runtime (TensorRT/CUDA execution providers when
+available) instead of PyTorch. The rest of the model (prompt encoder, mask decoder) stays
+in PyTorch.
+
+Export once with:
+    CKPT_PATH=<checkpoint_path> CFG_PATH=<CFG_PATH> python -m api.onnx_encoder [output.onnx]
+and point the server at it with ENCODER_ONNX (defaults to weights/sam2_encoder.onnx).
+"""
+
+import logging
+import os
+import sys
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+# In order of preference, whatever the installed onnxruntime build doesn't have is skipped
+_PROVIDERS = [
+    ("TensorrtExecutionProvider", {"trt_fp16_enable": True, "trt_engine_cache_enable": True}),
+    ("CUDAExecutionProvider", {}),
+    ("CPUExecutionProvider", {}),
+]
+
+
+class _FlatEncoder(torch.nn.Module):
+    """image_encoder with its dict output flattened into (*backbone_fpn, *vision_pos_enc)"""
+
+    def __init__(self, encoder):
+        super().__init__()
+        self.encoder = encoder
+
+    def forward(self, sample):
+        out = self.encoder(sample)
+        return (*out["backbone_fpn"], *out["vision_pos_enc"])
+
+
+def export_encoder(model, onnx_path):
+    """Export model.image_encoder at the fixed (1, 3, image_size, image_size) input set_image uses"""
+    size = model.image_size
+    sample = torch.zeros((1, 3, size, size), dtype=torch.float32, device=model.device)
+    num_levels = len(model.image_encoder(sample)["backbone_fpn"])
+    torch.onnx.export(
+        _FlatEncoder(model.image_encoder).eval(),
+        sample,
+        onnx_path,
+        input_names=["image"],
+        output_names=[f"fpn_{i}" for i in range(num_levels)]
+        + [f"pos_{i}" for i in range(num_levels)],
+        opset_version=17,
+    )
+
+
+def use_onnx_encoder(model, onnx_path):
+    """
+    Replace model.image_encoder.forward with an ONNX Runtime session over an exported encoder.
+    On cuda the session reads and writes torch tensors in place through io binding, so the
+    features never leave the gpu.
+    """
+    import onnxruntime as ort
+
+    available = ort.get_available_providers()
+    providers = [(name, opts) for name, opts in _PROVIDERS if name in available]
+    cache_dir = os.path.dirname(os.path.abspath(onnx_path))
+    providers = [
+        (name, {**opts, "trt_engine_cache_path": cache_dir})
+        if name == "TensorrtExecutionProvider"
+        else (name, opts)
+        for name, opts in providers
+    ]
+    session = ort.InferenceSession(onnx_path, providers=providers)
+    logger.info(f"Image encoder running on onnxruntime with {session.get_providers()}")
+
+    outputs_meta = session.get_outputs()
+    num_levels = len(outputs_meta) // 2
+    device = model.device
+
+    def run_cuda(sample):
+        device_id = device.index or 0
+        binding = session.io_binding()
+        binding.bind_input(
+            "image", "cuda", device_id, np.float32, tuple(sample.shape), sample.data_ptr()
+        )
+        outputs = [
+            torch.empty(tuple(meta.shape), dtype=torch.float32, device=device)
+            for meta in outputs_meta
+        ]
+        for meta, out in zip(outputs_meta, outputs):
+            binding.bind_output(
+                meta.name, "cuda", device_id, np.float32, tuple(out.shape), out.data_ptr()
+            )
+        # onnxruntime works on its own stream, make sure the input is actually there
+        torch.cuda.current_stream(device).synchronize()
+        session.run_with_iobinding(binding)
+        return outputs
+
+    def run_host(sample):
+        outputs = session.run(None, {"image": sample.cpu().numpy()})
+        return [torch.from_numpy(out).to(device) for out in outputs]
+
+    def forward(sample):
+        sample = sample.float().contiguous()
+        outputs = run_cuda(sample) if device.type == "cuda" else run_host(sample)
+        features, pos = outputs[:num_levels], outputs[num_levels:]
+        return {"vision_features": features[-1], "vision_pos_enc": pos, "backbone_fpn": features}
+
+    model.image_encoder.forward = forward
+
+
+if __name__ == "__main__":
+    from src.models.sam2.build_sam import build_sam2
+
+    logging.basicConfig(level=logging.INFO)
+    ckpt_path = os.environ.get("CKPT_PATH", "weights/sam2.1_hiera_base_plus.pt")
+    cfg_path = os.environ.get("CFG_PATH", "configs/sam2.1/sam2.1_hiera_b+.yaml")
+    onnx_path = sys.argv[1] if len(sys.argv) > 1 else "weights/sam2_encoder.onnx"
+    # export on cpu, the execution providers take care of the target device
+    export_encoder(build_sam2(cfg_path, ckpt_path, device="cpu"), onnx_path)
+    logger.info(f"Image encoder exported to {onnx_path}")
@@ -1,24 +1,43 @@
+import asyncio
 import logging
 import io
+import hashlib
+import threading
 import uuid
-from contextlib import asynccontextmanager
+from collections import OrderedDict
+from contextlib import asynccontextmanager, ExitStack
 from typing import List, Dict, Any, Optional, Tuple
 import os
 
 import numpy as np
+import torch
 from PIL import Image
 from fastapi import FastAPI, UploadFile, File, HTTPException, Path
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 
+
+def _resolve_device(device: str) -> str:
+    """DEVICE=auto (the default) picks the fastest backend available: cuda > mps > cpu"""
+    if device != "auto":
+        return device
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
 # CKPT_PATH = "weights/sam2.1_hiera_base_plus.pt"
 # CFG_PATH = "configs/sam2.1/sam2.1_hiera_b+.yaml"
-DEVICE = os.environ["DEVICE"]  # "mps "Or "cuda" or  "cpu"
+DEVICE = _resolve_device(os.environ.get("DEVICE", "auto"))  # "auto", "cuda", "mps" or "cpu"
 
 
 from src.models.sam2.build_sam import build_sam2
 from src.models.sam2.sam2_image_predictor import SAM2ImagePredictor
 
 from src.utils import get_convex_hull
+from api.onnx_encoder import use_onnx_encoder
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,6 +47,16 @@ app_state: Dict[str, Any] = {}
 
 CKPT_PATH = os.environ.get("CKPT_PATH", "weights/sam2.1_hiera_base_plus.pt")
 CFG_PATH = os.environ.get("CFG_PATH", "configs/sam2.1/sam2.1_hiera_b+.yaml")
+# How many images' embeddings to keep around for when the client flips back to them
+EMBED_CACHE_SIZE = int(os.environ.get("EMBED_CACHE_SIZE", "16"))
+# Exported image encoder (see api/onnx_encoder.py), used in place of the pytorch one if present
+ENCODER_ONNX = os.environ.get("ENCODER_ONNX", "weights/sam2_encoder.onnx")
+USE_ONNX_ENCODER = os.path.exists(ENCODER_ONNX)
+# torch.compile the image encoder, on by default only where it pays off (cuda)
+COMPILE_ENCODER = (
+    not USE_ONNX_ENCODER
+    and os.environ.get("COMPILE_ENCODER", "1" if DEVICE == "cuda" else "0") == "1"
+)
 
 
 class PredictRequestData(BaseModel):
@@ -53,24 +82,87 @@ class PredictResponse(BaseModel):
     )
 
 
-# --- Lifespan Manager (Loads model on startup) ---
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup: Load the base SAM model
+class PredictBatchRequestData(BaseModel):
+    items: List[PredictRequestData] = Field(
+        default_factory=list,
+        description="Independent predict requests on the same image, decoded together.",
+    )
+
+
+class PredictBatchResponse(BaseModel):
+    predictions: List[List[List[List[List[int]]]]] = Field(
+        ..., description="PredictResponse.predictions of each item, in request order."
+    )
+
+
+def _load_model():
+    """
+    Builds and warms up the model. Blocking, runs in the threadpool while the server is
+    already answering. base_model is published last, endpoints treat it as the ready flag.
+    """
     logger.info(f"Loading base SAM2 model onto device: {DEVICE}...")
     try:
-        base_model = build_sam2(CFG_PATH, CKPT_PATH, device=DEVICE)
+        if DEVICE == "cpu" and "hiera_l" in os.path.basename(CFG_PATH):
+            logger.warning(
+                "Running the large SAM2 model on cpu, every embed will take a long while. "
+                "Consider sam2.1_hiera_tiny.pt with configs/sam2.1/sam2.1_hiera_t.yaml instead."
+            )
+        if DEVICE == "cuda":
+            major, minor = torch.cuda.get_device_capability()
+            logger.info(f"Using {torch.cuda.get_device_name()} (compute capability {major}.{minor})")
+            # bf16 and tf32 only run on tensor cores from ampere on, older cards stay at fp32
+            app_state["use_bf16"] = major >= 8
+            # let the fp32 ops autocast leaves alone use tensor cores too
+            torch.backends.cuda.matmul.allow_tf32 = major >= 8
+            torch.backends.cudnn.allow_tf32 = major >= 8
+            # encoder input shape never changes, let cudnn pick the fastest conv algorithms once
+            torch.backends.cudnn.benchmark = True
+            # all model work goes on one side stream, see _inference_context
+            app_state["cuda_stream"] = torch.cuda.Stream()
+        overrides = ["++model.compile_image_encoder=true"] if COMPILE_ENCODER else []
+        base_model = build_sam2(CFG_PATH, CKPT_PATH, device=DEVICE, hydra_overrides_extra=overrides)
+        if DEVICE == "cuda":
+            # NHWC conv weights for tensor cores, cudnn follows the weight layout for the input
+            base_model = base_model.to(memory_format=torch.channels_last)
+        if USE_ONNX_ENCODER:
+            use_onnx_encoder(base_model, ENCODER_ONNX)
+        # one predictor for the whole session, set_image just swaps its features.
+        # the lock keeps an embed from swapping them under a running predict
+        predictor = SAM2ImagePredictor(base_model)
+        app_state["predictor_lock"] = threading.Lock()
+        # image content digest --> predictor.get_image_state(), least recently used first
+        app_state["embed_cache"] = OrderedDict()
+        if COMPILE_ENCODER or DEVICE == "cuda":
+            # the encoder input is always resized to image_size, so one dummy embed + click
+            # compiles the only encoder graph we need and gets the cuda/cudnn lazy init
+            # out of the way before the first real request
+            logger.info("Warming up SAM2...")
+            size = base_model.image_size
+            with _inference_context():
+                predictor.set_image(np.zeros((size, size, 3), dtype=np.uint8))
+                predictor.predict(
+                    point_coords=np.array([[size / 2, size / 2]], dtype=np.float32),
+                    point_labels=np.ones(1, dtype=np.int32),
+                )
+            predictor.reset_predictor()
+        app_state["predictor"] = predictor
         app_state["base_model"] = base_model
-        # This cache will store predictor instances keyed by image_id
-        app_state["image_predictor"] = None
-        app_state["active_image"] = None
         logger.info("Base SAM2 model loaded successfully.")
     except Exception as e:
         logger.error(f"Fatal error loading base model: {e}", exc_info=True)
 
-        app_state["base_model"] = None  # Indicate loading failure
-        app_state["image_predictor"] = None
-        app_state["active_image"] = None
+
+# --- Lifespan Manager (Loads model on startup) ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app_state["base_model"] = None  # Stays None while loading or if loading failed
+    app_state["predictor"] = None
+    # This cache will store predictor instances keyed by image_id
+    app_state["image_predictor"] = None
+    app_state["active_image"] = None
+    # Startup: Load the base SAM model in the background, so the server is up (answering
+    # 503 for model calls) instead of refusing connections for the whole load
+    app_state["model_loading"] = asyncio.create_task(run_in_threadpool(_load_model))
 
     yield  # Application runs here
 
@@ -86,6 +178,127 @@ app = FastAPI(
 )
 
 
+def _inference_context() -> ExitStack:
+    """
+    inference_mode everywhere, plus bf16 autocast on cuda (ampere and newer) where SAM2 is
+    tested at bf16.
+    On cuda the work is also queued on the server's own stream. Requests run on whichever
+    threadpool thread is free, the shared stream keeps a predict ordered after the
+    set_image that produced its features.
+    """
+    stack = ExitStack()
+    stack.enter_context(torch.inference_mode())
+    if DEVICE == "cuda":
+        stack.enter_context(torch.cuda.stream(app_state["cuda_stream"]))
+        if app_state.get("use_bf16"):
+            stack.enter_context(torch.autocast(device_type="cuda", dtype=torch.bfloat16))
+    return stack
+
+
+def _embed(contents: bytes) -> SAM2ImagePredictor:
+    """
+    Decodes the upload and runs the image encoder, or restores the features if the same
+    image was embedded recently. Blocking, keep it off the event loop.
+    """
+    predictor = app_state["predictor"]
+    cache = app_state["embed_cache"]
+    key = hashlib.blake2b(contents, digest_size=16).digest()
+    with app_state["predictor_lock"]:
+        cached = cache.get(key)
+        if cached is not None:
+            cache.move_to_end(key)
+            predictor.set_image_state(cached)
+            logger.info("Reusing cached image embeddings.")
+            return predictor
+
+    image = Image.open(io.BytesIO(contents))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    with app_state["predictor_lock"], _inference_context():
+        logger.info("Creating image embeddings...")
+        # set_image takes the PIL image as is, large ones get shrunk before any full size
+        # numpy/float copy is made
+        predictor.set_image(image)
+        logger.info("Embeddings created.")
+        cache[key] = predictor.get_image_state()
+        if len(cache) > EMBED_CACHE_SIZE:
+            cache.popitem(last=False)
+    return predictor
+
+
+def _predict(
+    predictor: SAM2ImagePredictor, image_id: str, items: List[PredictRequestData], k: int
+) -> Optional[List[list]]:
+    """
+    Runs the decoder over every prompt group of every item, all items' prompts batched
+    together. Blocking, keep it off the event loop.
+    Returns None if another image got embedded in the meantime.
+    """
+    point_groups, boxes, spans = [], [], []
+    for item in items:
+        # if number of points and boxes don't match the missing ones count as None
+        num_prompts = max(len(item.point_groups), len(item.boxes))
+        spans.append(range(len(point_groups), len(point_groups) + num_prompts))
+        point_groups.extend(item.point_groups)
+        point_groups.extend([None] * (num_prompts - len(item.point_groups)))
+        boxes.extend(item.boxes)
+        boxes.extend([None] * (num_prompts - len(item.boxes)))
+
+    with app_state["predictor_lock"], _inference_context():
+        if app_state["active_image"] != image_id:
+            return None
+        results = _decode_prompts(predictor, point_groups, boxes, k)
+    return [[results[i] for i in span if i in results] for span in spans]
+
+
+def _decode_prompts(
+    predictor: SAM2ImagePredictor, point_groups: list, boxes: list, k: int
+) -> Dict[int, list]:
+    """Polygons of each non-empty prompt keyed by its index, point_groups and boxes line up"""
+    num_prompts = len(point_groups)
+
+    # Prompts with the same kind of input (points and/or box) share one decoder pass
+    batches: Dict[Tuple[bool, bool], List[int]] = {}
+    for i in range(num_prompts):
+        points, box = point_groups[i], boxes[i]
+        if not points and not box:
+            logger.warning("Skipping empty prompt (no points and no box).")
+            continue
+        batches.setdefault((bool(points), bool(box)), []).append(i)
+
+    results = {}
+    for (has_points, has_box), idxs in batches.items():
+        coords, labels, box_batch = None, None, None
+        if has_points:
+            lengths = np.array([len(point_groups[i]) for i in idxs])
+            valid = np.arange(lengths.max()) < lengths[:, None]
+            coords = np.zeros((*valid.shape, 2), dtype=np.float32)
+            # one conversion for the whole batch, the mask scatters it row by row
+            coords[valid] = [point for i in idxs for point in point_groups[i]]
+            # -1 marks padding, the prompt encoder gives those the not-a-point embedding
+            labels = np.where(valid, 1, -1).astype(np.int32)
+        if has_box:
+            box_batch = np.array([boxes[i] for i in idxs], dtype=np.float32)
+
+        logger.debug(f"Predicting {len(idxs)} prompts with points: {has_points}, box: {has_box}")
+        preds, confids, masks = predictor.predict(
+            point_coords=coords,
+            point_labels=labels,
+            box=box_batch,
+            mask_input=None,
+        )
+        # a batch of one comes back without the batch axis
+        preds = preds.reshape(len(idxs), -1, *preds.shape[-2:])
+        # Keep every candidate the model is reasonably confident about
+        keep = confids.reshape(len(idxs), -1) >= 0.1
+
+        for row, i in enumerate(idxs):
+            results[i] = [
+                get_convex_hull(mask, k=k).astype(np.int32, copy=False).tolist()
+                for mask in preds[row][keep[row]]
+            ]
+    return results
 
 
 # ---------- End points #
@@ -101,15 +314,11 @@ async def embed_image(image_file: UploadFile = File(..., description="Image file
     try:
         # Read image data
         contents = await image_file.read()
-        image = Image.open(io.BytesIO(contents)).convert("RGB")
-        image_np = np.array(image)
-        image_np = np.ascontiguousarray(image_np)  # Ensure contiguous memory
 
-        predictor = SAM2ImagePredictor(app_state["base_model"])
-        
-        logger.info("Creating image embeddings...")
-        predictor.set_image(image_np)
-        logger.info("Embeddings created.")
+        # invalidate the previous image id before its features get overwritten
+        app_state["active_image"] = None
+        app_state["image_predictor"] = None
+        predictor = await run_in_threadpool(_embed, contents)
 
         image_id = str(uuid.uuid4())
 
@@ -137,6 +346,25 @@ async def predict_on_image(
     points and/or bounding boxes. Requires the `image_id` obtained
     from the /embed endpoint.
     """
+    all_results = await _run_predict(image_id, [request_data], k)
+    return PredictResponse(predictions=all_results[0])
+
+
+@app.post("/predict_batch/{image_id}", response_model=PredictBatchResponse, tags=["SAM2"])
+async def predict_batch_on_image(
+    image_id: str = Path(..., description="The unique ID of the previously embedded image."),
+    k: int = 6,
+    request_data: PredictBatchRequestData = ...,
+):
+    """
+    Same as /predict for several requests at once, their prompts go through the
+    decoder together.
+    """
+    all_results = await _run_predict(image_id, request_data.items, k)
+    return PredictBatchResponse(predictions=all_results)
+
+
+async def _run_predict(image_id: str, items: List[PredictRequestData], k: int) -> List[list]:
     if app_state.get("base_model") is None:
         raise HTTPException(status_code=503, detail="Model not loaded or failed to load.")
 
@@ -155,61 +383,28 @@ async def predict_on_image(
 
     try:
         logger.info(f"Performing prediction for image_id: {image_id}")
-        all_results = []
-
-        np_point_groups = [
-            np.array(group, dtype=np.float32) if group else None
-            for group in request_data.point_groups
-        ]
-        np_boxes = [(np.array(b, dtype=np.float32) if b else None) for b in request_data.boxes]
-
-        # Ensure lengths match or handle appropriately based on predictor needs
-        num_prompts = max(len(np_point_groups), len(np_boxes))
-
-        # if number of points and boxes don't match
-        if len(np_point_groups) < num_prompts:
-            np_point_groups.extend([None] * (num_prompts - len(np_point_groups)))
-        if len(np_boxes) < num_prompts:
-            np_boxes.extend([None] * (num_prompts - len(np_boxes)))
-
-        for points, box in zip(np_point_groups, np_boxes):
-            if points is None and box is None:
-                logger.warning("Skipping empty prompt (no points and no box).")
-                continue
-
-            logger.debug(f"Predicting with points: {points is not None}, box: {box is not None}")
-            preds, confids, masks = predictor.predict(
-                point_coords=points,
-                point_labels=np.ones(len(points)) if points is not None else None,
-                box=box,
-                mask_input=None,
-            )
-
-            if preds is not None and len(preds) > 0 and confids is not None and len(confids) > 0:
-                # Process the best prediction (highest confidence)
-                # best_mask = preds[confids.argmax()]
-                preds_filtered = preds[confids >= 0.1]
-                polygons = [
-                    get_convex_hull(mask, k=k).astype(np.int32).tolist() for mask in preds_filtered
-                ]
-                # polygon = get_convex_hull(
-                #   best_mask
-                # )  # Assumes returns List[List[float/int]]
-                all_results.append(polygons)
-            else:
-                logger.warning("Prediction returned no valid results for a prompt.")
-
-        return PredictResponse(predictions=all_results)
-
+        all_results = await run_in_threadpool(_predict, predictor, image_id, items, k)
     except Exception as e:
         logger.error(f"Error during prediction for image_id {image_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+    if all_results is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Image ID '{image_id}' was replaced by a newer embedding.",
+        )
+    return all_results
+
 
 # --- Optional: Add a root endpoint for basic check ---
 @app.get("/", tags=["Status"])
 async def read_root():
-    model_status = "Loaded" if app_state.get("base_model") else "Not Loaded/Error"
+    if app_state.get("base_model"):
+        model_status = "Loaded"
+    elif not app_state["model_loading"].done():
+        model_status = "Loading"
+    else:
+        model_status = "Not Loaded/Error"
     return {"message": "SAM2 Service is running", "model_status": model_status}
 
 
@@ -1,16 +1,11 @@
 import sys
-import os
 import argparse
-import yaml
 
-from PyQt6.QtCore import QCoreApplication, Qt
-from PyQt6.QtGui import QIcon
-from PyQt6.QtWidgets import QApplication, QStyle, QDialog
-from PyQt6.QtGui import QPalette, QColor
+from PyQt6.QtGui import QColor, QIcon, QPalette
+from PyQt6.QtWidgets import QApplication
 
 from src.ui import MainWindow
 from src.startup import get_or_create_project
-from src.project import Project, StartupDialog
 
 
 def apply_dark_theme(app):
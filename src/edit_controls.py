@@ -61,17 +61,14 @@ class EditManager:
     def paste(self, **kwargs):
         if isinstance(self.clipboard, MaskData):
             if pointer := kwargs.get("pointer", None):
-                new_points = [
-                    [
-                        coord[0] + pointer.x() - self.clipboard.center.x(),
-                        coord[1] + pointer.y() - self.clipboard.center.y(),
-                    ]
-                    for coord in self.clipboard.points
-                ]
+                new_points = self.clipboard.points + (
+                    pointer.x() - self.clipboard.center.x(),
+                    pointer.y() - self.clipboard.center.y(),
+                )
             else:
                 new_points = self.clipboard.points
             obj_copy = MaskData(
-                mask_id=self.latest_assigned_ids["mask"] + 1,
+                id=self.latest_assigned_ids["mask"] + 1,
                 points=new_points,
                 label=self.clipboard.label,
                 center=self.clipboard.center,
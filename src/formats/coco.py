@@ -1,4 +1,5 @@
 from typing import Union
+from itertools import chain
 import json
 import zipfile
 import os
@@ -50,7 +51,8 @@ def export_annotations_to_zip(
                     "id": annotation_id,
                     "image_id": image_idx + 1,
                     "category_id": category_mapping[obj["label"]],
-                    "segmentation": [sum(obj["polygon"], [])],  # Flatten polygon points
+                    # Flatten polygon points, sum(polygon, []) would copy the list at every vertex
+                    "segmentation": [list(chain.from_iterable(obj["polygon"]))],
                     "bbox": __polygon_to_bbox(obj["polygon"]),
                     "iscrowd": 0,
                 }
@@ -94,11 +96,10 @@ def import_annotations_from_zip(input_zip_path: PathLike, urls: list, dataset_ty
     category_mapping = {cat["id"]: cat["name"] for cat in coco_data["categories"]}
 
     image_annotations = {img["file_name"]: [] for img in coco_data["images"]}
+    # image id --> file name, instead of scanning all images for every annotation
+    image_names = {img["id"]: img["file_name"] for img in coco_data["images"]}
     for annotation in coco_data["annotations"]:
-        image_name = next(
-            (img["file_name"] for img in coco_data["images"] if img["id"] == annotation["image_id"]),
-            None,
-        )
+        image_name = image_names.get(annotation["image_id"])
         if image_name:
             if "segmentation" in annotation and annotation["segmentation"]:
                 polygon = [
@@ -1,7 +1,11 @@
 from typing import Optional
+from contextlib import contextmanager
+from dataclasses import dataclass
 import logging
 import math
 
+import numpy as np
+
 from PyQt6.QtWidgets import (
     QGraphicsPolygonItem,
     QGraphicsView,
@@ -19,6 +23,7 @@ from PyQt6.QtCore import (
     QRectF,
     pyqtSignal,
     QReadWriteLock,
+    QTimer,
 )
 from PyQt6.QtGui import (
     QBrush,
@@ -32,15 +37,56 @@ from PyQt6.QtGui import (
 )
 
 
-from .utils import is_inside_rect, ControlItem, ModelPrompts, MaskData, get_logger
+from .utils import (
+    is_inside_rect,
+    clip_polygon,
+    points_to_qpolygon,
+    ControlItem,
+    ModelPrompts,
+    MaskData,
+    get_logger,
+)
 
 logger = get_logger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
+@dataclass(eq=False)
+class PolyMeta(object):
+    """Data stored on a mask polygon item(setData(0, ...))"""
+
+    __slots__ = ("mask_id", "label", "vertices")
+
+    mask_id: int
+    label: str
+    vertices: list
+
+
+@dataclass(eq=False)
+class VertexMeta(object):
+    """Data stored on a polygon's vertex item(setData(0, ...))"""
+
+    __slots__ = ("polygon_item", "index")
+
+    polygon_item: QGraphicsPolygonItem
+    index: int
+
+
+class MaskPolygonItem(QGraphicsPolygonItem):
+    """Polygon item of a finished mask, as opposed to the temporary one being drawn."""
+
+    Type = QGraphicsItem.UserType + 2
+
+    def type(self):
+        return MaskPolygonItem.Type
+
+
 class VertexItem(QGraphicsEllipseItem):
     """Custom item for polygon vertices that updates the parent polygon when moved."""
 
+    # Item type tag, lets event handlers dispatch on type() instead of isinstance()
+    Type = QGraphicsItem.UserType + 1
+
     def __init__(self, x, y, width, height):
         super().__init__(x, y, width, height)
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemSendsGeometryChanges, True)
@@ -50,6 +96,9 @@ class VertexItem(QGraphicsEllipseItem):
         self.base_size = 15
         self.hovered = False
 
+    def type(self):
+        return VertexItem.Type
+
     def paint(self, painter, option, widget=None):
         rect = QRectF(-self.base_size / 2, -self.base_size / 2, self.base_size, self.base_size)
         painter.setBrush(self.brush())
@@ -72,14 +121,15 @@ class VertexItem(QGraphicsEllipseItem):
         return path
 
     def itemChange(self, change, value):
-        if change == QGraphicsItem.GraphicsItemChange.ItemPositionChange and self.data(0):
-            new_pos = value
-            polygon_item = self.data(0)
-            index = self.data(1)
-            poly = polygon_item.polygon()
-            poly[index] = value
-            polygon_item.setPolygon(poly)
-            return new_pos
+        if change == QGraphicsItem.GraphicsItemChange.ItemPositionChange:
+            meta: Optional[VertexMeta] = self.data(0)
+            if meta:
+                # The item's own polygon buffer isn't exposed to python, so write the single
+                # vertex into the (implicitly shared) copy and hand it back in one call
+                poly = meta.polygon_item.polygon()
+                poly.replace(meta.index, value)
+                meta.polygon_item.setPolygon(poly)
+                return value
         return super().itemChange(change, value)
 
     def hoverEnterEvent(self, event):
@@ -102,6 +152,8 @@ class ImageViewer(QGraphicsView):
     )  # Change of selection by hovering, useful for copying objects
     object_deselected = pyqtSignal(int)
 
+    MOVE_INTERVAL_MS = 16  # ~60Hz, hover work is coalesced to this rate
+
     COLOR_CYCLE = [
         Qt.GlobalColor.black,
         Qt.GlobalColor.red,
@@ -119,8 +171,12 @@ class ImageViewer(QGraphicsView):
 
         self.object_lock = QReadWriteLock()
 
-        self.color_dict = color_dict
-        self.__last_label__ = list(self.color_dict.keys())[0]
+        # label -> QColor, converted once instead of unpacking rgb tuples on every draw
+        self.color_dict = {label: QColor(*rgb) for label, rgb in color_dict.items()}
+        self.fill_color_dict = {label: QColor(*rgb, 50) for label, rgb in color_dict.items()}
+        # first label, the fallback whenever no label is picked
+        self.default_label = next(iter(self.color_dict))
+        self.__last_label__ = self.default_label
         self.image_item = None  # QGraphicsPixmapItem for the image
         self.id_to_poly = {}  # mask_id --> poly dict
         self.boxes = []  # List of [start, end] QPointF pairs for box annotations
@@ -130,6 +186,7 @@ class ImageViewer(QGraphicsView):
 
         self.temp_points = []  # Temporary points for current polygon
         self.temp_lines = []  # Temporary lines connecting points
+        self.temp_ellipses = []  # Temporary markers on the points
         self.temp_polygon = None  # Temporary shaded polygon during drawing
         self.mode = "model"
         # MANUAL MODE params
@@ -163,6 +220,14 @@ class ImageViewer(QGraphicsView):
 
         self.rubber_band: QRubberBand
 
+        # Latest mouse position waiting for the coalesced move handler
+        self._pending_pos: Optional[QPointF] = None
+        self._pending_view_pos: Optional[QPoint] = None
+        self._move_timer = QTimer(self)
+        self._move_timer.setInterval(ImageViewer.MOVE_INTERVAL_MS)
+        self._move_timer.setSingleShot(True)
+        self._move_timer.timeout.connect(self._process_move)
+
         # Optimize rendering
         self.setRenderHint(QPainter.RenderHint.Antialiasing)
         self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
@@ -178,9 +243,19 @@ class ImageViewer(QGraphicsView):
         # For simplicity, toggle with right-click in this example
         # self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
 
+    @contextmanager
+    def _bulk_scene_update(self):
+        """Disable the scene's BSP index while adding many items, it is rebuilt once on exit"""
+        index_method = self.image_scene.itemIndexMethod()
+        self.image_scene.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.NoIndex)
+        try:
+            yield
+        finally:
+            self.image_scene.setItemIndexMethod(index_method)
+
     def set_last_label(self, label):
         if label == "":
-            self.__last_label__ = list(self.color_dict.keys())[0]
+            self.__last_label__ = self.default_label
         else:
             self.__last_label__ = label
 
@@ -206,6 +281,22 @@ class ImageViewer(QGraphicsView):
             self.image_scene.removeItem(self.temp_polygon)
             # self.temp_polygon = None
 
+    def _clip_to_image(self, points: np.ndarray) -> np.ndarray:
+        """Clip polygon points to the image bounds, vertices can be dropped past the edges"""
+        if not self.image_item:
+            return points
+        image_rect = self.image_item.boundingRect()
+        x_min, y_min, x_max, y_max = image_rect.getCoords()
+        if (
+            len(points) == 0
+            or points[:, 0].min() >= x_min
+            and points[:, 1].min() >= y_min
+            and points[:, 0].max() <= x_max
+            and points[:, 1].max() <= y_max
+        ):
+            return points
+        return clip_polygon(points, image_rect)
+
     def clear_prompts(self):
         self.num_prompt_objs = 0
         self.current_prompt_color = self.COLOR_CYCLE[0]
@@ -219,9 +310,10 @@ class ImageViewer(QGraphicsView):
     def set_image(self, pixmap):
         """Set the image to display and fit it to the view."""
         # Clear any existing content
-        self.image_scene.clear()
-        # self.image_item = QGraphicsPixmapItem(pixmap)
-        self.image_item = self.image_scene.addPixmap(pixmap)
+        with self._bulk_scene_update():
+            self.image_scene.clear()
+            # self.image_item = QGraphicsPixmapItem(pixmap)
+            self.image_item = self.image_scene.addPixmap(pixmap)
         if self.image_item:
             self.setSceneRect(self.image_item.boundingRect())
             scale_x = self.rect().width() / self.image_item.boundingRect().width()
@@ -278,35 +370,36 @@ class ImageViewer(QGraphicsView):
         self.temp_ellipses = []
         self.object_lock.unlock()
 
+    def _add_mask_polygon(self, qpoly: QPolygonF, pen: QPen) -> MaskPolygonItem:
+        polygon_item = MaskPolygonItem(qpoly)
+        polygon_item.setPen(pen)
+        self.image_scene.addItem(polygon_item)
+        return polygon_item
+
     def display_polygons(self, mask_data_list: list[MaskData]):
         """Display polygons loaded by the main ui's object list"""
         # if self.image_item:
         #     self.image_item.setOpacity(0.5)
         self.polygon_items = []
-        for mask_data in mask_data_list:
-            qpoly = QPolygonF([QPointF(x, y) for x, y in mask_data.points])
-            polygon_item = self.image_scene.addPolygon(
-                qpoly,
-                pen=QColor(*self.color_dict[mask_data.label]),
-                # brush=QBrush(QColor(0, 255, 0, 128)),
-            )
-            if polygon_item:
-                polygon_item.setData(0, mask_data.id)  # id
-                polygon_item.setData(1, mask_data.label)  # label
-                vertices = []
-                self.id_to_poly[mask_data.id] = polygon_item
-                self.polygon_items.append(polygon_item)
-                # Add movable vertices
-                for i, point in enumerate(qpoly):
-                    vertex_item = VertexItem(0, 0, 10, 10)
-                    vertex_item.setPos(point.x() - 3, point.y() - 3)
-                    vertex_item.setBrush(QColor(*self.color_dict[mask_data.label]))
-                    vertex_item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
-                    vertex_item.setData(0, polygon_item)  # Reference to polygon
-                    vertex_item.setData(1, i)  # Index in polygon
-                    vertices.append(vertex_item)
-                    self.image_scene.addItem(vertex_item)
-                polygon_item.setData(2, vertices)
+        with self._bulk_scene_update():
+            for mask_data in mask_data_list:
+                qpoly = points_to_qpolygon(mask_data.points)
+                color = self.color_dict[mask_data.label]
+                polygon_item = self._add_mask_polygon(qpoly, QPen(color))
+                if polygon_item:
+                    vertices = [None] * len(qpoly)
+                    polygon_item.setData(0, PolyMeta(mask_data.id, mask_data.label, vertices))
+                    self.id_to_poly[mask_data.id] = polygon_item
+                    self.polygon_items.append(polygon_item)
+                    # Add movable vertices
+                    for i, point in enumerate(qpoly):
+                        vertex_item = VertexItem(0, 0, 10, 10)
+                        vertex_item.setPos(point.x() - 3, point.y() - 3)
+                        vertex_item.setBrush(color)
+                        vertex_item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
+                        vertex_item.setData(0, VertexMeta(polygon_item, i))
+                        vertices[i] = vertex_item
+                        self.image_scene.addItem(vertex_item)
 
     def add_prediction_polys(self, mask_arr: list[list]):
         """Display polygons returned by the model with editable vertices.
@@ -316,38 +409,35 @@ class ImageViewer(QGraphicsView):
         #     self.image_item.setOpacity(0.5)
         self.polygon_items = []
         masks: list[MaskData] = []
-        for mask in mask_arr:
-            qpoly = QPolygonF([QPointF(y, x) for x, y in mask])
-            polygon_item = self.image_scene.addPolygon(
-                qpoly,
-                pen=QColor(*self.color_dict["background"]),
-                # brush=QBrush(QColor(0, 255, 0, 128)),
-            )
-            if polygon_item:
-                mask_data = MaskData(
-                    mask_id=self.mask_id,
-                    points=[QPoint(x, y) for x, y in mask],
-                    label="background",
-                    center=polygon_item.boundingRect().center(),
-                )
-                masks.append(mask_data)
-                polygon_item.setData(0, self.mask_id)
-                polygon_item.setData(1, "background")
-                vertices = []
-                self.polygon_items.append(polygon_item)
-                self.id_to_poly[self.mask_id] = polygon_item
-                # Add movable vertices
-                for i, point in enumerate(qpoly):
-                    vertex_item = VertexItem(0, 0, 10, 10)
-                    vertex_item.setPos(point.x() - 3, point.y() - 3)
-                    vertex_item.setBrush(QColor(*self.color_dict["background"]))
-                    vertex_item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
-                    vertex_item.setData(0, polygon_item)  # Reference to polygon
-                    vertex_item.setData(1, i)  # Index in polygon
-                    self.image_scene.addItem(vertex_item)
-                    vertices.append(vertex_item)
-                polygon_item.setData(2, vertices)
-                self.mask_id += 1
+        color = self.color_dict["background"]
+        with self._bulk_scene_update():
+            for mask in mask_arr:
+                # model returns [row, col] vertices, flip them to [x, y]
+                points = np.asarray(mask, dtype=np.float32)[:, ::-1]
+                qpoly = points_to_qpolygon(points)
+                polygon_item = self._add_mask_polygon(qpoly, QPen(color))
+                if polygon_item:
+                    mask_data = MaskData(
+                        id=self.mask_id,
+                        points=points,
+                        label="background",
+                        center=polygon_item.boundingRect().center(),
+                    )
+                    masks.append(mask_data)
+                    vertices = [None] * len(qpoly)
+                    polygon_item.setData(0, PolyMeta(self.mask_id, "background", vertices))
+                    self.polygon_items.append(polygon_item)
+                    self.id_to_poly[self.mask_id] = polygon_item
+                    # Add movable vertices
+                    for i, point in enumerate(qpoly):
+                        vertex_item = VertexItem(0, 0, 10, 10)
+                        vertex_item.setPos(point.x() - 3, point.y() - 3)
+                        vertex_item.setBrush(color)
+                        vertex_item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
+                        vertex_item.setData(0, VertexMeta(polygon_item, i))
+                        self.image_scene.addItem(vertex_item)
+                        vertices[i] = vertex_item
+                    self.mask_id += 1
         return masks
 
     def update_candidate_mask(self, mask_id, new_mask: list[list]):
@@ -356,22 +446,23 @@ class ImageViewer(QGraphicsView):
         item = self.id_to_poly[mask_id]
         item.setPolygon(qpoly)
 
-        if item and isinstance(item, QGraphicsPolygonItem):
-            old_brush = item.data(2).pop(0).brush()
-            for vertex_item in item.data(2):
+        if item and item.type() == MaskPolygonItem.Type:
+            meta: PolyMeta = item.data(0)
+            old_brush = meta.vertices.pop(0).brush()
+            for vertex_item in meta.vertices:
                 self.image_scene.removeItem(vertex_item)
                 vertex_item = None
-            vertices = []
-            for i, point in enumerate(qpoly):
-                vertex_item = VertexItem(0, 0, 10, 10)
-                vertex_item.setPos(point.x() - 3, point.y() - 3)
-                vertex_item.setBrush(old_brush)
-                vertex_item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
-                vertex_item.setData(0, item)  # Reference to polygon
-                vertex_item.setData(1, i)  # Index in polygon
-                self.image_scene.addItem(vertex_item)
-                vertices.append(vertex_item)
-            item.setData(2, vertices)
+            with self._bulk_scene_update():
+                vertices = [None] * len(qpoly)
+                for i, point in enumerate(qpoly):
+                    vertex_item = VertexItem(0, 0, 10, 10)
+                    vertex_item.setPos(point.x() - 3, point.y() - 3)
+                    vertex_item.setBrush(old_brush)
+                    vertex_item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
+                    vertex_item.setData(0, VertexMeta(item, i))
+                    self.image_scene.addItem(vertex_item)
+                    vertices[i] = vertex_item
+            meta.vertices = vertices
         self.object_lock.unlock()
 
     def highlight_polygon(self, mask_id):
@@ -380,7 +471,7 @@ class ImageViewer(QGraphicsView):
         self.object_lock.lockForRead()
         item = self.id_to_poly[mask_id]
         if item:
-            item.setBrush(QBrush(QColor(*self.color_dict[item.data(1)] + (50,))))
+            item.setBrush(QBrush(self.fill_color_dict[item.data(0).label]))
         self.object_lock.unlock()
 
     def unhighlight_polygon(self, mask_id):
@@ -395,7 +486,7 @@ class ImageViewer(QGraphicsView):
     def removePolygon(self, mask_id):
         self.object_lock.lockForWrite()
         poly_item: QGraphicsItem = self.id_to_poly[mask_id]
-        for vertex_item in poly_item.data(2):
+        for vertex_item in poly_item.data(0).vertices:
             self.image_scene.removeItem(vertex_item)
             vertex_item = None
         self.image_scene.removeItem(poly_item)
@@ -408,17 +499,20 @@ class ImageViewer(QGraphicsView):
         # TODO: handle deletion of polygons
         item: Optional[QGraphicsPolygonItem] = self.id_to_poly[mask_id]
         if item:
-            item.setData(1, label)
-            item.setPen(QColor(*self.color_dict[item.data(1)]))
+            meta: PolyMeta = item.data(0)
+            meta.label = label
+            color = self.color_dict[label]
+            item.setPen(color)
             item.setBrush(Qt.GlobalColor.transparent)
-            for vertex_item in item.data(2):
-                vertex_item.setBrush(QBrush(QColor(*self.color_dict[item.data(1)])))
+            for vertex_item in meta.vertices:
+                vertex_item.setBrush(QBrush(color))
         self.object_lock.unlock()
 
     
     def mousePressEvent(self, event):
         """Handle mouse press for point or box annotation."""
         pos = self.mapToScene(event.pos())
+        self._drop_pending_move()
         self.setFocus()
         if (
             event.button() == Qt.MouseButton.LeftButton
@@ -428,12 +522,12 @@ class ImageViewer(QGraphicsView):
             # "NORMAL" mode(like vim). No shape selected.
             if self.current_control == ControlItem.NORMAL:
                 item = self.image_scene.itemAt(pos, self.transform())
+                item_type = item.type() if item is not None else None
                 # Check if an old polygon's ellipses is clicked for edit
-                if isinstance(item, VertexItem):
+                if item_type == VertexItem.Type:
                     self.is_panning = False
                     self.dragging_vertex = item
-                elif isinstance(item, QGraphicsPolygonItem) and self.key_control_pressed:
-                    print ("?")
+                elif item_type == MaskPolygonItem.Type and self.key_control_pressed:
                     self.dragging_polygon = item
                 # Moving the image around if no scrollbar
                 elif self.transform().m11() <= 1:
@@ -503,8 +597,37 @@ class ImageViewer(QGraphicsView):
             super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
-        pos = self.mapToScene(event.pos())
         """Spy on mouse move events from the main window."""
+        pos = self.mapToScene(event.pos())
+        if (
+            self.dragging_vertex
+            or self.dragging_polygon
+            or self.is_panning
+            or self.is_selecting_roi
+            or self.is_prompt_box
+        ):
+            # Interactive drags stay synchronous so they track the cursor without lag
+            self._handle_move(pos, event.pos())
+        else:
+            # Hover hit-testing and temp polygon redraws run at most once per frame
+            self._pending_pos, self._pending_view_pos = pos, event.pos()
+            if not self._move_timer.isActive():
+                self._move_timer.start()
+        return super().mouseMoveEvent(event)
+
+    def _drop_pending_move(self):
+        """Forget a coalesced move that hasn't run yet, it's stale once a button changes"""
+        self._move_timer.stop()
+        self._pending_pos, self._pending_view_pos = None, None
+
+    def _process_move(self):
+        if self._pending_pos is None:
+            return
+        pos, view_pos = self._pending_pos, self._pending_view_pos
+        self._pending_pos, self._pending_view_pos = None, None
+        self._handle_move(pos, view_pos)
+
+    def _handle_move(self, pos: QPointF, view_pos: QPoint):
         if (
             self.current_control == ControlItem.POLYGON
             and len(self.temp_points) >= 1
@@ -517,14 +640,14 @@ class ImageViewer(QGraphicsView):
             self.temp_polygon = self.image_scene.addPolygon(
                 temp_poly,
                 pen=QPen(Qt.GlobalColor.black),
-                brush=QBrush(QColor(*self.color_dict[self.__last_label__] + (50,))),
+                brush=QBrush(self.fill_color_dict[self.__last_label__]),
             )
         else:
             if self.dragging_polygon:
                 new_center = pos
                 old_center = self.dragging_polygon.boundingRect().center()
                 self.dragging_polygon.setPos(new_center - old_center)
-                vertices: list[VertexItem] = self.dragging_polygon.data(2)
+                vertices: list[VertexItem] = self.dragging_polygon.data(0).vertices
                 for v in vertices:
                     v.setPos(v.pos() + (new_center - old_center))
                 self.image_scene.update()
@@ -537,7 +660,7 @@ class ImageViewer(QGraphicsView):
                 # self.dragging_vertex.setVisible(True)
             elif self.is_panning:
                 if self.last_pan_pos is not None:
-                    delta = event.pos() - self.last_pan_pos
+                    delta = view_pos - self.last_pan_pos
 
                     delta_scene = self.mapToScene(delta) - self.mapToScene(QPoint(0, 0))
                     current_transform = self.transform()
@@ -547,25 +670,25 @@ class ImageViewer(QGraphicsView):
                             -delta_scene.y() * current_transform.m22() * 2,
                         )
                     )
-                    self.last_pan_pos = event.pos()
+                    self.last_pan_pos = view_pos
             elif self.is_selecting_roi:
-                rect = QRect(self.start_roi_pos, event.pos()).normalized()
+                rect = QRect(self.start_roi_pos, view_pos).normalized()
                 self.rubber_band.setGeometry(rect)
 
             elif self.is_prompt_box:
-                rect = QRect(self.start_box_pos, event.pos()).normalized()
+                rect = QRect(self.start_box_pos, view_pos).normalized()
                 self.rubber_band.setGeometry(rect)
 
             elif len(self.image_scene.items()) > 1:
                 item = self.image_scene.itemAt(pos, self.transform())
-                if isinstance(item, QGraphicsPolygonItem):
-                    mask_id, label, vertices = item.data(0), item.data(1), item.data(2)
-                    item.setBrush(QColor(*self.color_dict[label] + (50,)))
+                if item is not None and item.type() == MaskPolygonItem.Type:
+                    meta: PolyMeta = item.data(0)
+                    item.setBrush(self.fill_color_dict[meta.label])
                     self.object_selected.emit(
                         MaskData(
-                            mask_id=mask_id,
-                            label=label,
-                            points=[[v.x(), v.y()] for v in vertices],
+                            id=meta.mask_id,
+                            label=meta.label,
+                            points=[(v.x(), v.y()) for v in meta.vertices],
                             center=item.boundingRect().center(),
                         )
                     )
@@ -582,10 +705,9 @@ class ImageViewer(QGraphicsView):
                     self.shaded_poly.setBrush(Qt.GlobalColor.transparent)
                     self.object_deselected.emit(1)
 
-        return super().mouseMoveEvent(event)
-
     def mouseReleaseEvent(self, event):
         """Undo the last selected point on right-click."""
+        self._drop_pending_move()
         if event.button() == Qt.MouseButton.LeftButton:
             if self.dragging_vertex:
                 self.dragging_vertex = None
@@ -650,7 +772,7 @@ class ImageViewer(QGraphicsView):
                 self.temp_polygon = self.image_scene.addPolygon(
                     temp_poly,
                     pen=QPen(Qt.GlobalColor.black),
-                    brush=QBrush(QColor(*self.color_dict[self.__last_label__] + (50,))),
+                    brush=QBrush(self.fill_color_dict[self.__last_label__]),
                 )
         return super().mouseReleaseEvent(event)
 
@@ -720,6 +842,37 @@ class ImageViewer(QGraphicsView):
             self.centerOn(self.image_item)
         return super().mouseDoubleClickEvent(event)
 
+    def _add_drawn_polygon(self, points: np.ndarray):
+        """Turn a finished manual polygon into a mask with movable vertices"""
+        final_poly = points_to_qpolygon(points)
+        color = self.color_dict[self.__last_label__]
+        polygon_item = self._add_mask_polygon(final_poly, QPen(color))
+        polygon_item.setData(0, PolyMeta(self.mask_id, self.__last_label__, []))
+        self.id_to_poly[self.mask_id] = polygon_item
+        self.polygon_items.append(polygon_item)
+
+        # Add movable vertices to the final polygon
+        vertices = [None] * len(final_poly)
+        for i, point in enumerate(final_poly):
+            vertex_item = VertexItem(0, 0, 15, 15)
+            vertex_item.setPos(point.x(), point.y())
+            vertex_item.setBrush(QBrush(color))
+            vertex_item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
+            vertex_item.setData(0, VertexMeta(polygon_item, i))
+            self.image_scene.addItem(vertex_item)
+            vertices[i] = vertex_item
+        polygon_item.data(0).vertices = vertices
+
+        # emit new mask to the object list
+        mask_data = MaskData(
+            self.mask_id,
+            points,
+            self.__last_label__,
+            center=polygon_item.boundingRect().center(),
+        )
+        self.object_added.emit(mask_data)
+        self.mask_id += 1
+
     def keyPressEvent(self, event):
         if self.mode == "manual":
             # Finalize current temp_poly, and add it to objects
@@ -734,56 +887,26 @@ class ImageViewer(QGraphicsView):
                         self.image_scene.removeItem(self.temp_polygon)
                         self.temp_polygon = None
 
-                    # Create final polygon
-                    final_poly = QPolygonF(self.temp_points)
-                    polygon_item = self.image_scene.addPolygon(
-                        final_poly,
-                        pen=QPen(QColor(*self.color_dict[self.__last_label__])),
-                        # brush=QBrush(QColor(255, 255, 0, 128)),
+                    points = self._clip_to_image(
+                        np.array([(p.x(), p.y()) for p in self.temp_points], dtype=np.float32)
                     )
-                    if polygon_item:
-                        polygon_item.setData(0, self.mask_id)
-                        self.id_to_poly[self.mask_id] = polygon_item
-                        polygon_item.setData(1, self.__last_label__)  # label
-                        polygon_item.setData(2, [])  # vertices
-                        self.polygon_items.append(polygon_item)
-
                     # Clear temporary drawing data
                     for line in self.temp_lines:
                         self.image_scene.removeItem(line)
                     for ellipse in self.temp_ellipses:
                         self.image_scene.removeItem(ellipse)
-                        polygon_item.setData(1, self.__last_label__)
-
-                    mask_data = MaskData(
-                        self.mask_id,
-                        self.temp_points,
-                        self.__last_label__,
-                        center=polygon_item.boundingRect().center(),
-                    )
-                    self.object_added.emit(mask_data)
-                    self.mask_id += 1
-                    # emit new mask to the object list
                     self.temp_lines = []
                     self.temp_points = []
                     self.temp_ellipses = []
 
-                    # Add movable vertices to the final polygon
-                    vertices = []
-                    for i, point in enumerate(final_poly):
-                        vertex_item = VertexItem(0, 0, 15, 15)
-                        vertex_item.setPos(point.x(), point.y())
-                        vertex_item.setBrush(QBrush(QColor(*self.color_dict[self.__last_label__])))
-                        vertex_item.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
-                        vertex_item.setData(0, polygon_item)
-                        vertex_item.setData(1, i)
-                        self.image_scene.addItem(vertex_item)
-                        vertices.append(vertex_item)
+                    # Nothing of the polygon may be left on the image, then it's just dropped
+                    if len(points) > 0:
+                        self._add_drawn_polygon(points)
 
-                    polygon_item.setData(2, vertices)
                     # reset states to NORMAL
                     self.prev_shape = self.current_control
                     self.current_control = ControlItem.NORMAL
+                    self.control_change.emit(ControlItem.NORMAL)
                     self.setCursor(Qt.CursorShape.ArrowCursor)
             # Remove the current temp poly upon pressing ESC
             elif event.key() == Qt.Key.Key_Escape:
@@ -11,7 +11,7 @@
 from PyQt6 import QtCore, QtWidgets
 from PyQt6.QtGui import QAction, QCursor, QIcon
 
-from PyQt6.QtCore import pyqtSignal, QPoint
+from PyQt6.QtCore import pyqtSignal, QPoint, QAbstractItemModel
 
 
 class CustomListItemWidget(QtWidgets.QWidget):
@@ -24,9 +24,14 @@ class CustomListItemWidget(QtWidgets.QWidget):
     eye_off_icon = QIcon("assets/eye-off.svg")
     delete_icon = QIcon("assets/trash-delete-bin.svg")
 
-    def __init__(self, classes: list = [], parent=None):
+    def __init__(self, classes: list = [], parent=None, label_model: QAbstractItemModel = None):
+        """
+        label_model: shared model of label names for the combo box, used instead of filling
+        it from classes. One model for every item instead of a copy of the labels per item
+        """
         super(CustomListItemWidget, self).__init__(parent)
         self.classes = classes
+        self.label_model = label_model
         self.mask_id = None
         # self.setAutoFillBackground(True)
         # self.setStyleSheet("background-color: lightblue; border: 1px solid black;")
@@ -74,8 +79,11 @@ class CustomListItemWidget(QtWidgets.QWidget):
 
         self.label_combo_box = QtWidgets.QComboBox(self)
         self.label_combo_box.setObjectName("label_combo_box")
-        for label in self.classes:
-            self.label_combo_box.addItem(label)
+        if self.label_model is not None:
+            self.label_combo_box.setModel(self.label_model)
+        else:
+            for label in self.classes:
+                self.label_combo_box.addItem(label)
         self.label_combo_box.setSizePolicy(
             QtWidgets.QSizePolicy.Policy.Expanding,  # This is the key change
             QtWidgets.QSizePolicy.Policy.Fixed,
@@ -160,8 +160,12 @@ def build_sam2_video_predictor_hf(model_id, **kwargs):
 
 def _load_checkpoint(model, ckpt_path):
     if ckpt_path is not None:
-        sd = torch.load(ckpt_path, map_location="cpu", weights_only=True)["model"]
-        missing_keys, unexpected_keys = model.load_state_dict(sd)
+        # mmap lets load_state_dict copy straight out of the page cache instead of
+        # reading the whole checkpoint into an intermediate buffer first
+        sd = torch.load(ckpt_path, map_location="cpu", weights_only=True, mmap=True)["model"]
+        # assign swaps the mapped tensors in as the parameters instead of copying them into
+        # the freshly initialised ones, the .to(device) afterwards does the only real copy
+        missing_keys, unexpected_keys = model.load_state_dict(sd, assign=True)
         if missing_keys:
             logging.error(missing_keys)
             raise RuntimeError()
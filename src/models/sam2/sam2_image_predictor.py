@@ -54,6 +54,9 @@ class SAM2ImagePredictor:
         self._orig_hw = None
         # Whether the predictor is set for single image or a batch of images
         self._is_batch = False
+        # Reused pinned host buffer for the single image upload, see _upload
+        self._pinned_input = None
+        self._pinned_upload_done = None
 
         # Predictor config
         self.mask_threshold = mask_threshold
@@ -82,7 +85,7 @@ class SAM2ImagePredictor:
         sam_model = build_sam2_hf(model_id, **kwargs)
         return cls(sam_model, **kwargs)
 
-    @torch.no_grad()
+    @torch.inference_mode()
     def set_image(
         self,
         image: Union[np.ndarray, Image],
@@ -108,7 +111,7 @@ class SAM2ImagePredictor:
             raise NotImplementedError("Image format not supported")
 
         input_image = self._transforms(image)
-        input_image = input_image[None, ...].to(self.device)
+        input_image = self._upload(input_image[None, ...])
 
         assert len(input_image.shape) == 4 and input_image.shape[1] == 3, (
             f"input_image must be of size 1x3xHxW, got {input_image.shape}"
@@ -128,7 +131,29 @@ class SAM2ImagePredictor:
         self._is_image_set = True
         logging.info("Image embeddings computed.")
 
-    @torch.no_grad()
+    def _upload(self, input_image: torch.Tensor) -> torch.Tensor:
+        """
+        Copies the transformed image to the model device. On cuda it goes through a
+        pinned buffer that is kept across calls (the input shape is fixed by the
+        resize), so the host to device copy is async and doesn't re-pin every time.
+        """
+        device = self.device
+        if device.type != "cuda":
+            return input_image.to(device)
+        if self._pinned_input is None or self._pinned_input.shape != input_image.shape:
+            self._pinned_input = torch.empty(
+                input_image.shape, dtype=input_image.dtype, pin_memory=True
+            )
+        elif self._pinned_upload_done is not None:
+            # the previous upload may still be reading from the buffer
+            self._pinned_upload_done.synchronize()
+        self._pinned_input.copy_(input_image)
+        device_image = self._pinned_input.to(device, non_blocking=True)
+        self._pinned_upload_done = torch.cuda.Event()
+        self._pinned_upload_done.record()
+        return device_image
+
+    @torch.inference_mode()
     def set_image_batch(
         self,
         image_list: List[Union[np.ndarray]],
@@ -226,6 +251,7 @@ class SAM2ImagePredictor:
 
         return all_masks, all_ious, all_low_res_masks
 
+    @torch.inference_mode()
     def predict(
         self,
         point_coords: Optional[np.ndarray] = None,
@@ -318,7 +344,7 @@ class SAM2ImagePredictor:
                 mask_input = mask_input[None, :, :, :]
         return mask_input, unnorm_coords, labels, unnorm_box
 
-    @torch.no_grad()
+    @torch.inference_mode()
     def _predict(
         self,
         point_coords: Optional[torch.Tensor],
@@ -428,6 +454,23 @@ class SAM2ImagePredictor:
         assert self._features is not None, "Features must exist if an image has been set."
         return self._features["image_embed"]
 
+    def get_image_state(self) -> tuple:
+        """
+        Returns what set_image/set_image_batch computed for the current image(s), so it
+        can be restored later with set_image_state instead of running the encoder again.
+        """
+        if not self._is_image_set:
+            raise RuntimeError("An image must be set with .set_image(...) to save its state.")
+        return self._features, self._orig_hw, self._is_batch
+
+    def set_image_state(self, state: tuple) -> None:
+        """
+        Restores a state returned by get_image_state, predictions then run as if that
+        image had just been set again.
+        """
+        self._features, self._orig_hw, self._is_batch = state
+        self._is_image_set = True
+
     @property
     def device(self) -> torch.device:
         return self.model.device
@@ -6,9 +6,11 @@
 
 import warnings
 
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from PIL import Image
 from torchvision.transforms import Normalize, Resize, ToTensor
 
 
@@ -33,9 +35,22 @@ class SAM2Transforms(nn.Module):
         )
 
     def __call__(self, x):
-        x = self.to_tensor(x)
+        x = self.to_tensor(self._shrink(x))
         return self.transforms(x)
 
+    def _shrink(self, x):
+        """
+        Resizes images larger than the model resolution while they are still uint8,
+        so to_tensor only has to convert resolution x resolution pixels to float.
+        """
+        if isinstance(x, np.ndarray):
+            if x.dtype != np.uint8 or max(x.shape[:2]) <= self.resolution:
+                return x
+            x = Image.fromarray(x)
+        if isinstance(x, Image.Image) and max(x.size) > self.resolution:
+            x = x.resize((self.resolution, self.resolution), Image.BILINEAR)
+        return x
+
     def forward_batch(self, img_list):
         img_batch = [self.transforms(self.to_tensor(img)) for img in img_list]
         img_batch = torch.stack(img_batch, dim=0)
@@ -1,6 +1,13 @@
 import os
+import hashlib
+import json
+import mmap
+import tempfile
 import yaml
-from pathlib import Path
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Tuple
 from PyQt6.QtWidgets import (
     QButtonGroup,
     QDialog,
@@ -18,15 +25,146 @@ from PyQt6.QtWidgets import (
     QListWidget,
     QListWidgetItem,
     QDialogButtonBox,
+    QMessageBox,
 )
 from PyQt6.QtSvgWidgets import QSvgWidget
-from PyQt6.QtGui import QPixmap, QColor
+from PyQt6.QtGui import QIcon, QImage, QPixmap, QPixmapCache, QColor
 from PyQt6.QtCore import Qt
 
 from src.colorpicker import ColorPickerWidget
 
+# Prefer the libyaml backed (C) loader/dumper, fall back to the pure python ones
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+
 PROJECTS_DIR = os.path.expanduser("~/.samstudio/projects")
+# parsed project yamls, see _read_project_data
+DATA_CACHE_DIR = os.path.expanduser("~/.samstudio/cache")
+MAX_LOAD_WORKERS = 8
+THUMBNAIL_SIZE = 48
 os.makedirs(PROJECTS_DIR, exist_ok=True)
+os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+
+# What the startup dialog lists, the full Project is only loaded for the selected one
+ProjectStub = namedtuple("ProjectStub", "name description thumbnail path")
+
+# Optional project fields, merged under the parsed yaml in one go
+_PROJECT_DEFAULTS = {"description": "", "thumbnail": "", "location": "", "labels": {}}
+
+# yaml path --> (st_mtime_ns, ProjectStub), reused by load_all_stubs while the file is unchanged
+_PROJECT_CACHE: Dict[str, Tuple[int, ProjectStub]] = {}
+
+# os.umask can only be read by setting it, done once here rather than racing other threads later
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def thumbnail_cache_path(name):
+    return os.path.join(PROJECTS_DIR, f"{name}.thumb.png")
+
+
+def _scale_thumbnail(path):
+    # QImage rather than QPixmap so project saves can do this off the GUI thread
+    return QImage(path).scaled(
+        THUMBNAIL_SIZE,
+        THUMBNAIL_SIZE,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation,
+    )
+
+
+def load_thumbnail(name, thumbnail):
+    """
+    Icon sized pixmap of a project's thumbnail. Uses the pre-scaled copy saved next to the
+    project yaml when it is newer than the source image, and keeps it in QPixmapCache so
+    reopening the dialog doesn't touch the disk again. Returns None if the image is missing.
+    """
+    try:
+        source_mtime = os.stat(thumbnail).st_mtime_ns
+    except OSError:
+        return None
+    key = f"samstudio-thumb:{thumbnail}:{source_mtime}"
+    pixmap = QPixmapCache.find(key)
+    if pixmap is not None:
+        return pixmap
+    cache_path = thumbnail_cache_path(name)
+    if os.path.exists(cache_path) and os.stat(cache_path).st_mtime_ns >= source_mtime:
+        pixmap = QPixmap(cache_path)
+    else:
+        image = _scale_thumbnail(thumbnail)
+        image.save(cache_path)
+        pixmap = QPixmap.fromImage(image)
+    QPixmapCache.insert(key, pixmap)
+    return pixmap
+
+
+def _read_yaml(path):
+    """Parse a yaml file straight from a read-only memory map. Empty files give None"""
+    with open(path, "rb") as f:
+        # mmap can't map a zero length file
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return yaml.load(mm, Loader=_Loader)
+
+
+def _data_cache_path(path):
+    """
+    In the app's own cache dir, keyed by the resolved yaml path. Never next to the yaml,
+    which can be anywhere the user picked it from
+    """
+    digest = hashlib.sha1(os.path.realpath(path).encode("utf-8")).hexdigest()
+    return os.path.join(DATA_CACHE_DIR, f"{digest}.json")
+
+
+@contextmanager
+def _atomic_open(path, mode="w", sync=False):
+    """
+    Write to a temp file in path's directory and move it over path once complete, so a
+    crash mid-write never leaves a truncated file behind. sync fsyncs before the move.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        # mkstemp makes the file 0600, give it the mode a plain open() would have
+        os.fchmod(fd, 0o666 & ~_UMASK)
+        with os.fdopen(fd, mode) as f:
+            yield f
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _write_data_cache(path, mtime, data):
+    """Store the parsed yaml as json, tagged with the yaml mtime it was parsed from"""
+    try:
+        with _atomic_open(_data_cache_path(path), "w") as f:
+            json.dump({"mtime": mtime, "data": data}, f)
+    except (OSError, TypeError, ValueError):
+        pass  # just a cache (and yaml can hold more than json), the yaml is still there
+
+
+def _read_project_data(path):
+    """
+    Parsed contents of a project yaml. Served from the json cache while the yaml's mtime
+    still matches, otherwise the yaml is parsed and the cache rewritten.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    try:
+        with open(_data_cache_path(path), "r") as f:
+            cached = json.load(f)
+        if cached["mtime"] == mtime:
+            return cached["data"]
+    except (OSError, ValueError, TypeError, KeyError):
+        pass
+    data = _read_yaml(path)
+    _write_data_cache(path, mtime, data)
+    return data
 
 
 class Project:
@@ -35,8 +173,16 @@ class Project:
         self.description = description
         self.thumbnail = thumbnail
         self.location = location
+        # frozen ((name, (r, g, b)), ...), labels only change through the dialogs before saving
+        if not isinstance(labels, tuple):
+            labels = tuple((name, tuple(rgb)) for name, rgb in (labels or {}).items())
         self.labels = labels
 
+    @property
+    def labels_dict(self):
+        """labels as a fresh name --> rgb dict, for code that wants to edit them"""
+        return dict(self.labels)
+
     @property
     def yaml_path(self):
         return os.path.join(PROJECTS_DIR, f"{self.name}.yaml")
@@ -47,39 +193,67 @@ class Project:
             "description": self.description,
             "thumbnail": self.thumbnail,
             "location": self.location,
-            "labels": self.labels,
+            "labels": {name: list(rgb) for name, rgb in self.labels},
         }
-        with open(self.yaml_path, "w") as f:
-            yaml.safe_dump(data, f)
+        with _atomic_open(self.yaml_path, "w", sync=True) as f:
+            yaml.dump(data, f, Dumper=_Dumper)
+        _write_data_cache(self.yaml_path, os.stat(self.yaml_path).st_mtime_ns, data)
+        # decode and downscale the thumbnail once, the startup dialog only shows the small copy
+        if self.thumbnail and os.path.exists(self.thumbnail):
+            _scale_thumbnail(self.thumbnail).save(thumbnail_cache_path(self.name))
 
     @staticmethod
     def load(path):
-        with open(path, "r") as f:
-            data = yaml.safe_load(f)
-            return Project(
-                data["name"],
-                data.get("description", ""),
-                data.get("thumbnail", ""),
-                data.get("location", ""),
-                data.get("labels", {}),
-            )
+        return Project.from_data(_read_project_data(path))
+
+    @staticmethod
+    def from_data(data):
+        data = {**_PROJECT_DEFAULTS, **data}
+        return Project(
+            data["name"], data["description"], data["thumbnail"], data["location"], data["labels"]
+        )
 
     @staticmethod
     def load_all():
-        projects = []
-        for file in Path(PROJECTS_DIR).glob("*.yaml"):
-            with open(file, "r") as f:
-                data = yaml.safe_load(f)
-                projects.append(
-                    Project(
-                        data["name"],
-                        data.get("description", ""),
-                        data.get("thumbnail", ""),
-                        data.get("location", ""),
-                        data.get("labels", {}),
-                    )
-                )
-        return projects
+        """Fully load every project in PROJECTS_DIR"""
+        return [Project.load(stub.path) for stub in Project.load_all_stubs()]
+
+    @staticmethod
+    def load_all_stubs():
+        with os.scandir(PROJECTS_DIR) as it:
+            entries = [e for e in it if e.is_file() and e.name.endswith((".yaml", ".yml"))]
+        stubs = [None] * len(entries)
+        stale = []  # (position, path, mtime) of files that need parsing
+        for idx, entry in enumerate(entries):
+            mtime = entry.stat().st_mtime_ns
+            cached = _PROJECT_CACHE.get(entry.path)
+            if cached is not None and cached[0] == mtime:
+                stubs[idx] = cached[1]
+            else:
+                stale.append((idx, entry.path, mtime))
+
+        if stale:
+            # overlap the file reads/parses of the changed projects
+            with ThreadPoolExecutor(max_workers=min(MAX_LOAD_WORKERS, len(stale))) as pool:
+                parsed = pool.map(_parse_stub, [path for _, path, _ in stale])
+                for (idx, path, mtime), stub in zip(stale, parsed):
+                    if stub is not None:
+                        stubs[idx] = stub
+                        _PROJECT_CACHE[path] = (mtime, stub)
+
+        # Forget project files that were deleted since the last scan
+        for path in _PROJECT_CACHE.keys() - {e.path for e in entries}:
+            del _PROJECT_CACHE[path]
+        return [stub for stub in stubs if stub is not None]
+
+
+def _parse_stub(path):
+    """Read one project file's listing fields(module level so it can be handed to an executor)"""
+    data = _read_project_data(path)
+    if not data:
+        return None
+    data = {**_PROJECT_DEFAULTS, **data}
+    return ProjectStub(data["name"], data["description"], data["thumbnail"], path)
 
 
 class ProjectCreateDialog(QDialog):
@@ -324,14 +498,18 @@ class StartupDialog(QDialog):
         self.project_list.setStyleSheet(
             "QListWidget {background-color: transparent; color: #2f67f5;}"
         )
-        self.projects = Project.load_all()
+        self.projects = Project.load_all_stubs()
+        # fill the list with updates off so it lays out and repaints once
+        self.project_list.setUpdatesEnabled(False)
         for proj in self.projects:
             item = QListWidgetItem(f"{proj.name}\n{proj.description}")
-            if proj.thumbnail and os.path.exists(proj.thumbnail):
-                pixmap = QPixmap(proj.thumbnail).scaled(48, 48, Qt.AspectRatioMode.KeepAspectRatio)
-                item.setIcon(pixmap)
+            # the stat in load_thumbnail doubles as the existence check
+            pixmap = load_thumbnail(proj.name, proj.thumbnail) if proj.thumbnail else None
+            if pixmap is not None:
+                item.setIcon(QIcon(pixmap))
             item.setData(Qt.ItemDataRole.UserRole, proj)
             self.project_list.addItem(item)
+        self.project_list.setUpdatesEnabled(True)
         left_panel.addWidget(recents_label)
         left_panel.addWidget(self.project_list)
 
@@ -354,7 +532,8 @@ class StartupDialog(QDialog):
     def get_selected_project(self):
         item = self.project_list.currentItem()
         if item:
-            return item.data(Qt.ItemDataRole.UserRole)
+            stub: ProjectStub = item.data(Qt.ItemDataRole.UserRole)
+            return Project.load(stub.path)
         self.close()
         return None
 
@@ -362,7 +541,12 @@ class StartupDialog(QDialog):
         dlg = ProjectCreateDialog(self)
         if dlg.show():
             proj = dlg.get_project()
-            proj.save()
+            # saved right here, a new project that didn't make it to disk isn't one
+            try:
+                proj.save()
+            except OSError as e:
+                QMessageBox.warning(self, "Project not saved", f"Could not save {proj.name}: {e}")
+                return None
             return proj
         return None
 
@@ -1,43 +1,162 @@
+import io
+import threading
 from typing import Union
 from PIL import Image
 import requests
-from PyQt6.QtCore import QObject, pyqtSignal
+from requests.adapters import HTTPAdapter
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
 
 
 class RequestWorker(QObject):
+    # predict calls arriving within this window go to the server as one request
+    PREDICT_BATCH_WAIT_MS = 20
+    PREDICT_BATCH_SIZE = 16
+    # waits between connection checks, the last one repeats for as long as the model loads.
+    # Only probes that don't reach the server count toward giving up
+    CONNECTION_RETRY_DELAYS_MS = (200, 500, 1000, 2000, 5000)
+    CONNECTION_TIMEOUT = 2.0
+
     image_embedded = pyqtSignal(str)
     prediction_ready = pyqtSignal(list)
     connection_failed = pyqtSignal(str)
     connection_ok = pyqtSignal(str)
+    _embed_requested = pyqtSignal()
 
     def __init__(self, base_url):
         super().__init__()
         self.base_url = base_url
+        # Only the newest image waiting to be embedded, see queue_image
+        self._pending_image = None
+        self._pending_lock = threading.Lock()
+        self._embed_requested.connect(self._post_pending_image)
+        # (image_id, point_groups, boxes) waiting for the batch timer
+        self._pending_predicts = []
+        # parented so it moves to the worker thread along with us
+        self._predict_timer = QTimer(self)
+        self._predict_timer.setSingleShot(True)
+        self._predict_timer.setInterval(self.PREDICT_BATCH_WAIT_MS)
+        self._predict_timer.timeout.connect(self._flush_predicts)
+        # one timer for the whole retry chain, so a new check_connection replaces the old chain
+        self._probe_timer = QTimer(self)
+        self._probe_timer.setSingleShot(True)
+        self._probe_timer.timeout.connect(self._probe_connection)
+        self._connection_attempt = 0
+        self._unreachable_probes = 0
+        # keep-alive across calls instead of a new connection per request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def check_connection(self):
+        self._probe_timer.stop()
+        self._connection_attempt = 0
+        self._unreachable_probes = 0
+        self._probe_connection()
+
+    @pyqtSlot()
+    def _probe_connection(self):
+        """
+        One short status request. Until the model is loaded it retries with growing
+        delays through _probe_timer, so the worker keeps serving other calls in between.
+        A server that answers but is still loading is polled for as long as that takes.
+        """
+        error = None
         try:
-            response = requests.get(self.base_url)
+            response = self.session.get(self.base_url, timeout=self.CONNECTION_TIMEOUT)
             if response.ok:
-                self.connection_ok.emit("Ready")
+                status = response.json().get("model_status", "Loaded")
+                if status == "Loaded":
+                    self.connection_ok.emit("Ready")
+                    return
             else:
-                self.connection_failed.emit("Connection Error")
-        except requests.exceptions.ConnectionError as e:
-            self.connection_failed.emit(str(e))
+                error = "Connection Error"
+        except (requests.exceptions.RequestException, ValueError) as e:
+            error = str(e)
+
+        delays = self.CONNECTION_RETRY_DELAYS_MS
+        if error is not None:
+            self._unreachable_probes += 1
+            if self._unreachable_probes > len(delays):
+                self.connection_failed.emit(error)
+                return
+        self._probe_timer.start(delays[min(self._connection_attempt, len(delays) - 1)])
+        self._connection_attempt += 1
+
+    def queue_image(self, image: Union[bytes, Image.Image]):
+        """
+        Called from the GUI thread (connect with DirectConnection). Flipping through images
+        queues an embed per image, but only the last one still matters by the time the
+        worker gets to it, so older pending images are just replaced.
+        """
+        with self._pending_lock:
+            self._pending_image = image
+        self._embed_requested.emit()
+
+    @pyqtSlot()  # a real slot so it runs on the worker's thread after moveToThread
+    def _post_pending_image(self):
+        with self._pending_lock:
+            image, self._pending_image = self._pending_image, None
+        if image is not None:
+            self.post_image(image)
 
     def post_image(self, image: Union[bytes, Image.Image]):
         if isinstance(image, Image.Image):
-            image_bytes = image.tobytes()
+            # send an encoded image, raw pixels are ~10x bigger and the server can't open them
+            buf = io.BytesIO()
+            image.convert("RGB").save(buf, format="JPEG", quality=90)
+            image_file = ("image.jpg", buf.getvalue(), "image/jpeg")
         else:
-            image_bytes = image
+            # already the encoded file contents
+            image_file = image
+        data = self._post_json("embed/", files={"image_file": image_file})
+        if data is not None:
+            self.image_embedded.emit(data["image_id"])
+
+    def _post_json(self, path, **kwargs):
+        """
+        POST to the api and return the parsed response. An unreachable server, an error
+        status or a broken body is reported through connection_failed and gives None, these
+        run in slots where an exception would abort the app.
+        """
         try:
-            response = requests.post(self.base_url + "embed/", files={"image_file": image_bytes})
-            return self.image_embedded.emit(response.json()["image_id"])
+            response = self.session.post(self.base_url + path, **kwargs)
+            if not response.ok:
+                endpoint = path.split("/")[0]
+                self.connection_failed.emit(f"{endpoint} failed: {response.status_code}")
+                return None
+            return response.json()
         except requests.exceptions.ConnectionError:
             self.connection_failed.emit("Connection Error")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.connection_failed.emit(str(e))
+        return None
 
     def predict(self, image_id, text, point_groups: list, boxes: list):
-        response = requests.post(
-            self.base_url + "predict/" + image_id + "/?k=6",
-            json={"point_groups": point_groups, "boxes": boxes},
-        )
-        self.prediction_ready.emit(response.json()["predictions"])
+        """Queue the request, it goes out with whatever else arrives in the next few ms"""
+        self._pending_predicts.append((image_id, point_groups, boxes))
+        if len(self._pending_predicts) >= self.PREDICT_BATCH_SIZE:
+            self._flush_predicts()
+        elif not self._predict_timer.isActive():
+            self._predict_timer.start()
+
+    @pyqtSlot()
+    def _flush_predicts(self):
+        self._predict_timer.stop()
+        pending, self._pending_predicts = self._pending_predicts, []
+        # one request per image, keeping the order results are emitted in
+        by_image = {}
+        for image_id, point_groups, boxes in pending:
+            by_image.setdefault(image_id, []).append(
+                {"point_groups": point_groups, "boxes": boxes}
+            )
+        for image_id, items in by_image.items():
+            if len(items) == 1:
+                data = self._post_json("predict/" + image_id + "/?k=6", json=items[0])
+                if data is not None:
+                    self.prediction_ready.emit(data["predictions"])
+                continue
+            data = self._post_json("predict_batch/" + image_id + "/?k=6", json={"items": items})
+            if data is not None:
+                for predictions in data["predictions"]:
+                    self.prediction_ready.emit(predictions)
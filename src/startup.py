@@ -10,7 +10,6 @@ def get_or_create_project(parent=None, icon: Optional[QIcon] = None) -> Optional
         startup_dialog.setWindowIcon(icon)
         startup_dialog.setWindowTitle("Sam Labeling Studio")
     if startup_dialog.exec():
-        print ("dfdf")
         proj = startup_dialog.get_selected_project()
         if proj:
             return proj
@@ -1,17 +1,28 @@
-from PyQt6.QtCore import QObject, QThread, pyqtSignal, QMutex
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING
+
+from PyQt6.QtCore import QObject, QRunnable, QThread, pyqtSignal
+from PyQt6.QtGui import QImage
 
-import aiohttp
 import asyncio
 
 from src.utils import get_logger
 
+if TYPE_CHECKING:
+    import aiohttp
+
 
 class AsyncRemoteImageLoader(QObject):
     """Thread to load remote images asynchronously"""
 
-    image_loaded = pyqtSignal(str, bytes)
+    image_loaded = pyqtSignal(str, int)  # url, slot index in images
     error_occurred = pyqtSignal(str, str)
 
+    TIMEOUT_S = 10
+    MAX_RETRIES = 2
+    RETRY_BACKOFF_S = 0.2
+
     def __init__(self, urls, max_parralel_reqs: int = 10, images: list = []):
         super().__init__()
         self.urls = urls
@@ -19,50 +30,59 @@ class AsyncRemoteImageLoader(QObject):
         self.logger = get_logger(AsyncRemoteImageLoader.__name__)
         self.images = images
         self.max_parralel_reqs = max_parralel_reqs
-        self.semaphore = asyncio.Semaphore(self.max_parralel_reqs)
         self.running = True
 
-    async def fetch_one_image(self, session: aiohttp.ClientSession, url, index):
-        """Fetch a single image asynchronously"""
-        if not self.running:
-            return
-        try:
-            async with session.get(url, timeout=10) as response:
-                response.raise_for_status()
-                image_bytes = await response.read()
-                # image = Image.open(BytesIO(image_bytes))
+    async def fetch_one_image(self, session: "aiohttp.ClientSession", url, index):
+        """Fetch a single image asynchronously, retried with backoff on transient errors"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            if not self.running:
+                return
+            try:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    image_bytes = await response.read()
                 self.images[index] = image_bytes
-                if index == 0:
-                    self.image_loaded.emit(url, image_bytes)
-
-        except Exception as e:
-            self.error_occurred.emit(url, str(e))
+                self.image_loaded.emit(url, index)
+                return
+            except Exception as e:
+                # a 4xx won't change on a retry, a dropped connection or a 5xx might
+                if attempt == self.MAX_RETRIES or 400 <= getattr(e, "status", 0) < 500:
+                    self.error_occurred.emit(url, str(e))
+                    return
+                await asyncio.sleep(self.RETRY_BACKOFF_S * 2**attempt)
 
     async def load_images(self):
         if not self.urls:
             return
-        first_url = self.urls[0]
-        async with aiohttp.ClientSession() as session:
-            await self.fetch_one_image(session, first_url, 0)
-
-            tasks = [
-                self.fetch_with_semaphore(session, self.urls[idx], idx)
-                for idx in range(1, len(self.urls))
-            ]
-            await asyncio.gather(*tasks)
-
-    async def fetch_with_semaphore(self, session, url, index):
-        """Fetch an image with a semaphore to limit parallel requests."""
-        async with self.semaphore:
-            await self.fetch_one_image(session, url, index)
+        # imported here, aiohttp takes a while to import and only url lists need it
+        import aiohttp
+
+        # Fixed pool of fetchers pulling indices off a queue. Index 0 is queued first so it's
+        # picked up right away, but it no longer holds back the rest of the downloads
+        queue = asyncio.Queue()
+        for idx in range(len(self.urls)):
+            queue.put_nowait(idx)
+        num_workers = min(self.max_parralel_reqs, len(self.urls))
+        connector = aiohttp.TCPConnector(limit=num_workers, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.TIMEOUT_S)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await asyncio.gather(*(self.fetch_worker(session, queue) for _ in range(num_workers)))
+
+    async def fetch_worker(self, session, queue: asyncio.Queue):
+        while self.running and not queue.empty():
+            idx = queue.get_nowait()
+            await self.fetch_one_image(session, self.urls[idx], idx)
 
     def stop(self):
         """Stop the loader"""
         self.running = False
         if self.loop and self.loop.is_running():
-            for task in asyncio.all_tasks(self.loop):
-                task.cancel()
-            self.loop.call_soon_threadsafe(self.loop.stop)
+            # cancelled from the loop's own thread, run() then winds down on the CancelledError
+            self.loop.call_soon_threadsafe(self._cancel_tasks)
+
+    def _cancel_tasks(self):
+        for task in asyncio.all_tasks(self.loop):
+            task.cancel()
 
     def run(self):
         self.loop = asyncio.new_event_loop()
@@ -80,29 +100,66 @@ class AsyncRemoteImageLoader(QObject):
 class LocalImageLoader(QThread):
     """Thread to open images locally in batches"""
 
-    image_loaded = pyqtSignal(bytes)
+    MAX_READ_WORKERS = 8
+
+    image_loaded = pyqtSignal(str, int)  # path, slot index in image_list
 
     def __init__(self, image_paths: list, image_list: list):
-        # self.condition = QWaitCondition()
-        self.mutex = QMutex()
         super().__init__()
         self.paths = image_paths
         self.index = 0
         # self.background_load_num = min(background_load_num, len(image_paths))
         self.image_list = image_list
+        self.running = True
+
+    @staticmethod
+    def _read_one(path) -> bytes:
+        """Whole file in one read call, sized up front so nothing gets regrown"""
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.pread(fd, os.fstat(fd).st_size, 0)
+        finally:
+            os.close(fd)
+
+    def run(self):
+        self.image_list[0] = self._read_one(self.paths[0])
+        self.image_loaded.emit(self.paths[0], 0)
+        # the rest in parallel, file reads release the GIL
+        with ThreadPoolExecutor(max_workers=self.MAX_READ_WORKERS) as pool:
+            futures = {
+                pool.submit(self._read_one, path): idx
+                for idx, path in enumerate(self.paths[1:], start=1)
+            }
+            for future in as_completed(futures):
+                if not self.running:
+                    # drop the reads that haven't started, the pool waits for the rest
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                idx = futures[future]
+                self.image_list[idx] = future.result()
+                self.image_loaded.emit(self.paths[idx], idx)
+
+    def stop(self):
+        """Stop reading, already running reads finish but aren't reported"""
+        self.running = False
+
+
+class _DecodeSignals(QObject):
+    decoded = pyqtSignal(int, bytes, QImage)  # image index, encoded bytes, decoded image
+
+
+class ImageDecodeTask(QRunnable):
+    """
+    Decode an image's bytes into a QImage on a pool thread, the GUI thread then only has to
+    turn it into a pixmap. A QImage that failed to decode comes back null.
+    """
+
+    def __init__(self, index: int, data: bytes):
+        super().__init__()
+        self.index = index
+        self.data = data
+        self.signals = _DecodeSignals()
 
     def run(self):
-        with open(self.paths[0], "rb") as f:
-            self.image_list[0] = f.read()
-        self.image_loaded.emit(self.image_list[0])
-        self.mutex.lock()
-        for idx in range(1, len(self.paths)):
-            with open(self.paths[idx], "rb") as f:
-                self.image_list[idx] = f.read()
-        # self.condition.wait(self.mutex)
-        self.mutex.unlock()
-
-    def wake_up(self):
-        self.mutex.lock()
-        # self.condition.wakeOne()
-        self.mutex.unlock()
+        self.signals.decoded.emit(self.index, self.data, QImage.fromData(self.data))
@@ -1,10 +1,11 @@
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 from functools import partial
 from pathlib import Path
-import io
+import copy
 import os
 import yaml
 
+from PyQt6 import sip
 from PyQt6.QtWidgets import (
     QMainWindow,
     QDockWidget,
@@ -28,12 +29,15 @@ from PyQt6.QtCore import (
     Qt,
     QPoint,
     QThread,
+    QStringListModel,
+    QThreadPool,
+    QTimer,
     pyqtSignal,
 )
-from PIL import Image
 from PyQt6.QtGui import (
     QKeySequence,
     QPixmap,
+    QPixmapCache,
     QIcon,
     QAction,
     QColor,
@@ -43,16 +47,16 @@ from PyQt6.QtGui import (
 
 from .image_viewer import ImageViewer
 from .list_item_widget import CustomListItemWidget
-from .threads import AsyncRemoteImageLoader, LocalImageLoader
+from .threads import AsyncRemoteImageLoader, ImageDecodeTask, LocalImageLoader
 from .sam_thread import RequestWorker
 from .edit_controls import EditManager
 from .extra_dialogs import PreferencesDialog
 from .utils import (
-    pil_to_qimage,
     read_colors,
     gray_out_icon,
     get_logger,
     svg_to_icon,
+    qpolygon_to_points,
     ShapeDelegate,
     DataSource,
     ControlItem,
@@ -64,10 +68,38 @@ PathLike = Union[str, Path]
 
 logger = get_logger("Main UI")
 
+# Prefer the libyaml backed (C) loader, fall back to the pure python one
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+    logger.warning("libyaml not available, parsing yaml with the pure python loader")
+
+# config path --> ((st_mtime_ns, st_size), parsed config), reused while the file is unchanged
+_CONFIG_CACHE: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+
+
+def _read_config(yaml_path):
+    """Parsed app config, served from memory until the file's mtime or size changes"""
+    path = os.path.abspath(yaml_path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _CONFIG_CACHE.get(path)
+    if cached is None or cached[0] != stamp:
+        with open(path, "r") as stream:
+            cached = _CONFIG_CACHE[path] = (stamp, yaml.load(stream, Loader=_Loader))
+    # callers are free to modify what they get
+    return copy.deepcopy(cached[1])
+
 
 class MainWindow(QMainWindow):
     MEMORY_LIMIT = 200  # in megabytes
     MAX_PARALLEL_REQUESTS = 10
+    PIXMAP_CACHE_KB = 256 * 1024
+    SCRUB_DEBOUNCE_MS = 50
+    # frames around the shown one decoded ahead of time, mostly ahead since that's where it goes
+    PREFETCH_AHEAD, PREFETCH_BEHIND = 3, 1
 
     trigger_embbeding = pyqtSignal(bytes)
     trigger_prediction = pyqtSignal(str, str, list, list)  # image_id, text, points, boxes
@@ -88,6 +120,14 @@ class MainWindow(QMainWindow):
         self.setFocus()
         config = self.__load__config(arguments.get("config_path", "configs/app_config.yaml"))
         self.color_dict = read_colors(config["label_colors_file"]) if config else {}
+        # built once, object list items index into these instead of rebuilding them per item
+        self.labels = tuple(self.color_dict)
+        # shared by every object list item's label combo box
+        self.label_model = QStringListModel(list(self.labels), self)
+        self.label_combo: Optional[QComboBox] = None
+        # room for a handful of decoded full size images (in KB, Qt's default is 10MB)
+        QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), self.PIXMAP_CACHE_KB))
+        self.fill_color_dict = {label: QColor(*rgb, 50) for label, rgb in self.color_dict.items()}
 
         self.edit_hook = EditManager(set_actions=[], state_dict={}, latest_assigned_ids={"mask": 0})
         # Central widget with vertical layout
@@ -153,7 +193,13 @@ class MainWindow(QMainWindow):
 
         self.back_button.pressed.connect(self.go_back)
         self.forward_button.pressed.connect(self.go_forward)
-        self.slider.sliderMoved.connect(self.change_img_src)
+        # dragging the slider only loads the image it rests on, not every one passed on the way
+        self.scrub_timer = QTimer(self)
+        self.scrub_timer.setSingleShot(True)
+        self.scrub_timer.setInterval(MainWindow.SCRUB_DEBOUNCE_MS)
+        self.scrub_timer.timeout.connect(self.apply_slider_value)
+        self.slider.sliderMoved.connect(self._on_slider_moved)
+        self.slider.sliderReleased.connect(self.apply_slider_value)
 
         self.frame_info = QHBoxLayout()
         # Filename label
@@ -164,13 +210,14 @@ class MainWindow(QMainWindow):
         self.frame_index_edit = QLineEdit()
         self.frame_range_validator = QIntValidator(0, 0, self)
         self.frame_index_edit.setValidator(self.frame_range_validator)
-        self.frame_index_edit.textChanged.connect(self.show_image_by_index)
+        # on Enter/focus-out only, textChanged would load every prefix of the typed number
+        self.frame_index_edit.editingFinished.connect(self._on_frame_index_edited)
         self.frame_index_edit.setFixedWidth(30)
         self.frame_index_edit.setDisabled(True)
         self.frame_index_edit.setVisible(False)
         # self.frame_index_edit.setAlignment(Qt.AlignmentFlag.AlignRight)
 
-        self.slider.valueChanged.connect(lambda text: self.frame_index_edit.setText(str(text)))
+        self.slider.valueChanged.connect(self.on_slider_value_changed)
 
         self.total_frames = QLabel("")
         # self.total_frames.setAlignment(Qt.AlignmentFlag.AlignRight)
@@ -325,6 +372,18 @@ class MainWindow(QMainWindow):
             ],
             "model": [mouse_item, box_item, star_item],
         }
+        # grayed-out icons made once here, mode switches only swap icons
+        for item in (self.control_list.item(row) for row in range(self.control_list.count())):
+            icon = item.data(Qt.ItemDataRole.UserRole)
+            item.setData(Qt.ItemDataRole.UserRole + 1, gray_out_icon(icon))
+        # (item, icon, grayed-out icon) per mode, so switching doesn't go back to item.data()
+        self.control_mode_items = {
+            mode: tuple(
+                (item, item.data(Qt.ItemDataRole.UserRole), item.data(Qt.ItemDataRole.UserRole + 1))
+                for item in items
+            )
+            for mode, items in self.control_list_dict.items()
+        }
         self.control_list.setStyleSheet(
             """
             QListWidget::item {
@@ -339,8 +398,8 @@ class MainWindow(QMainWindow):
         self.control_dock.setWidget(self.control_list)
         self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.control_dock)
         # Connect mode toggle to update ImageViewer and button state
+        # the radios are exclusive, one of them toggles on every switch and that's enough
         self.model_mode_radio.toggled.connect(self.update_mode)
-        self.manual_mode_radio.toggled.connect(self.update_mode)
 
         # Right dock widget for object list
         self.object_dock = QDockWidget("", self)
@@ -363,7 +422,9 @@ class MainWindow(QMainWindow):
         # )
         # self.object_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.object_list.setResizeMode(QListView.ResizeMode.Adjust)
-        self.object_list.currentRowChanged.connect(self.on_object_selected)
+        self.object_list.currentRowChanged.connect(
+            self.schedule_object_selected, Qt.ConnectionType.DirectConnection
+        )
         self.object_dock.setWidget(self.anno_widget)
         self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.object_dock)
 
@@ -446,26 +507,36 @@ class MainWindow(QMainWindow):
         # async loader
         self.async_remote_loader = None
         self.loader_thread: Optional[QThread] = None
+        self.local_thread: Optional[LocalImageLoader] = None
         # Data storage
         self.prev_selected_obj_idx = None
+        # latest row selected in the object list, highlighted once per event loop pass
+        self.pending_selected_row: Optional[int] = None
         self.data_source = DataSource.LOCAL
         self.urls = []  # List of image URLs
-        self.images = [None] * MainWindow.MEMORY_LIMIT  # List of PIL.Image objects
-        self.start_idx, self.end_idx = 0, MainWindow.MEMORY_LIMIT
+        self.images = []  # encoded bytes of urls[start_idx:end_idx], None until loaded
+        self.start_idx, self.end_idx = 0, 0
 
         self.current_idx = 0  # Index of the current image
+        # index waiting on its image to finish loading before it can be shown
+        self.pending_idx: Optional[int] = None
+        # indices with a prefetch decode running, see prefetch_image
+        self.prefetching = set()
         self.id_to_candids = {}
         self.annotations = {}  # Dictionary to store annotations
-        self.current_image = None  # Current PIL image
+        self.current_image = None  # Encoded bytes of the current image
+        # index whose image and annotations are on screen, it lags current_idx while the
+        # new image decodes and is what save_annotations stores the object list under
+        self.displayed_idx: Optional[int] = None
         # Initial update to set button state
         self.update_mode()
 
         # signal connectors
-        self.image_viewer.object_added.connect(self.add_to_object_list)
-        self.image_viewer.control_change.connect(self.set_control)
-        self.image_viewer.object_selected.connect(
-            lambda mask_data: self.edit_hook.update_state(action=None, state=None, obj=mask_data)
+        self.image_viewer.object_added.connect(
+            self.add_to_object_list, Qt.ConnectionType.DirectConnection
         )
+        self.image_viewer.control_change.connect(self.set_control)
+        self.image_viewer.object_selected.connect(self.on_viewer_object_selected)
         # additional arguments
         self.use_native_file_dialog = arguments.get("use_native_file_dialog", True)
         self.__file_dialog_kwargs__ = {}
@@ -476,21 +547,35 @@ class MainWindow(QMainWindow):
         self.model_loaded, self.is_embedded = False, False
         self.embed_id: str
         #     self.model_thread = None
-        self.__init_model_thread__()
+        # after the first event loop pass, the window paints before the worker and its
+        # session get built and the first connection check goes out
+        QTimer.singleShot(0, self.__init_model_thread__)
 
     def __init_model_thread__(self):
         self.model_thread = QThread()
         self.model_worker = RequestWorker(self.request_url)
         self.model_worker.moveToThread(self.model_thread)
 
-        self.model_worker.image_embedded.connect(self.on_image_embedded)
-        self.model_worker.prediction_ready.connect(self.on_model_result)
-        self.model_worker.connection_failed.connect(self.show_api_warning)
-        self.model_worker.connection_ok.connect(self.show_api_ok)
+        # worker <-> window always cross threads, same-thread signals below go direct
+        self.model_worker.image_embedded.connect(
+            self.on_image_embedded, Qt.ConnectionType.QueuedConnection
+        )
+        self.model_worker.prediction_ready.connect(
+            self.on_model_result, Qt.ConnectionType.QueuedConnection
+        )
+        self.model_worker.connection_failed.connect(
+            self.show_api_warning, Qt.ConnectionType.QueuedConnection
+        )
+        self.model_worker.connection_ok.connect(self.show_api_ok, Qt.ConnectionType.QueuedConnection)
 
-        self.trigger_check_connection.connect(self.model_worker.check_connection)
-        self.trigger_embbeding.connect(self.model_worker.post_image)
-        self.trigger_prediction.connect(self.model_worker.predict)
+        self.trigger_check_connection.connect(
+            self.model_worker.check_connection, Qt.ConnectionType.QueuedConnection
+        )
+        # runs in this thread and just swaps the pending image, the post happens on the worker
+        self.trigger_embbeding.connect(
+            self.model_worker.queue_image, Qt.ConnectionType.DirectConnection
+        )
+        self.trigger_prediction.connect(self.model_worker.predict, Qt.ConnectionType.QueuedConnection)
 
         self.trigger_check_connection.emit()
         self.model_thread.start()
@@ -505,50 +590,43 @@ class MainWindow(QMainWindow):
         self.is_embedded = True
 
     def __load__config(self, yaml_path):
-        with open(yaml_path, "r") as stream:
-            try:
-                config_dict = yaml.safe_load(stream)
-                return config_dict
-            except yaml.YAMLError:
-                self.close()
+        try:
+            return _read_config(yaml_path)
+        except yaml.YAMLError:
+            self.close()
 
     def update_mode(self):
         """Update ImageViewer mode and Run Model button state based on radio selection."""
-        if self.model_mode_radio.isChecked():
-            self.image_viewer.set_mode("model")
-            if self.is_embedded:
-                self.run_model_action.setEnabled(True)
-
-            # Enable and disable items based on mode
-            for item in self.control_list_dict["manual"]:
-                # Set the grayed-out icon
-                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
-                item.setIcon(gray_out_icon(item.data(Qt.ItemDataRole.UserRole)))
-
-            for item in self.control_list_dict["model"]:
-                # Restore the original icon
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsSelectable)
-                item.setIcon(item.data(Qt.ItemDataRole.UserRole))
-
-        else:  # manual_mode_radio is checked
-            self.image_viewer.set_mode("manual")
-            self.image_viewer.clear_prompts()
-            self.run_model_action.setEnabled(False)
-
-            # Enable and disable items based on mode
-            for item in self.control_list_dict["model"]:
-                # Set the grayed-out icon
-                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
-                item.setIcon(gray_out_icon(item.data(Qt.ItemDataRole.UserRole)))
-
-            for item in self.control_list_dict["manual"]:
-                # Restore the original icon
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsSelectable)
-                item.setIcon(item.data(Qt.ItemDataRole.UserRole))
-
+        # one repaint of the list for all the flag/icon changes below, not one per item
+        self.control_list.setUpdatesEnabled(False)
+        try:
+            if self.model_mode_radio.isChecked():
+                self.image_viewer.set_mode("model")
+                if self.is_embedded:
+                    self.run_model_action.setEnabled(True)
+                self.apply_control_mode(enabled="model", disabled="manual")
+            else:  # manual_mode_radio is checked
+                self.image_viewer.set_mode("manual")
+                self.image_viewer.clear_prompts()
+                self.run_model_action.setEnabled(False)
+                self.apply_control_mode(enabled="manual", disabled="model")
+        finally:
+            self.control_list.setUpdatesEnabled(True)
         # Refresh the control list to apply visual changes
         self.control_list.viewport().update()
 
+    def apply_control_mode(self, enabled: str, disabled: str):
+        """
+        Gray out the `disabled` mode's control items and make them unselectable, then restore
+        the `enabled` ones. Items in both modes end up enabled
+        """
+        for item, _, grayed_icon in self.control_mode_items[disabled]:
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
+            item.setIcon(grayed_icon)
+        for item, icon, _ in self.control_mode_items[enabled]:
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsSelectable)
+            item.setIcon(icon)
+
     def load_url_list(self):
         """Load a text file containing image URLs."""
         file_name, _ = QFileDialog.getOpenFileName(
@@ -560,32 +638,20 @@ class MainWindow(QMainWindow):
         )
         if file_name:
             self.last_directory = Path(file_name).parent
-            with open(file_name, "r") as f:
-                self.urls = [line.strip() for line in f if line.strip()]
+            with open(file_name, "rb") as f:
+                lines = f.read().decode("utf-8").splitlines()
+            # strip and drop blank lines with map/filter, no per line python loop
+            self.urls = list(filter(None, map(str.strip, lines)))
             self.current_idx = 0
-            self.images = [None] * self.MEMORY_LIMIT
+            self.set_image_window(0)
             # if user rushes to select new files or urls, this should be set to None
             self.current_image = None
+            self.displayed_idx = None
+            self.pending_idx = self.current_idx
 
             self.data_source = DataSource.URL_REQUEST
             if self.urls:
-                self.slider.setMaximum(len(self.urls) - 1)
-                self.slider.setValue(self.current_idx)
-                self.frame_index_edit.setVisible(True)
-                self.frame_index_edit.setEnabled(True)
-                self.frame_index_edit.setText("0")
-                
-                self.total_frames.setText("/  " + str(len(self.urls) - 1))
-                self.frame_range_validator.setTop(len(self.urls) - 1)
-                self.frame_index_edit.setValidator(self.frame_range_validator)
-                self.update_filename_label()
-                if (
-                    self.loader_thread is not None and self.async_remote_loader is not None
-                ) and self.loader_thread.isRunning():
-                    self.async_remote_loader.stop()
-                    self.loader_thread.quit()
-                    self.loader_thread.wait()
-                    del self.async_remote_loader
+                self.init_navigation()
                 self.load_image_from_url(self.urls[self.start_idx : self.end_idx])
 
     def show_filepicker_dialog(self):
@@ -596,29 +662,36 @@ class MainWindow(QMainWindow):
             "Images (*.png *.jpg)",
             **self.__file_dialog_kwargs__,
         )
-        self.images = [None] * self.MEMORY_LIMIT
+        self.set_image_window(0)
         # if user rushes to select new files or urls, this should be set to None
         self.current_image = None
+        self.displayed_idx = None
         if len(self.urls) != 0:
             self.last_directory = Path(self.urls[0]).parent
             self.current_idx = 0
+            self.pending_idx = self.current_idx
             self.data_source = DataSource.LOCAL
 
-            # change slider data
-            self.slider.setMaximum(len(self.urls) - 1)
-            self.slider.setValue(self.current_idx)
-            self.frame_index_edit.setEnabled(True)
-            self.frame_index_edit.setVisible(True)
-            self.frame_index_edit.setText("0")
-                
-            self.total_frames.setText("/  " + str(len(self.urls) - 1))
-            self.frame_range_validator.setTop(len(self.urls) - 1)
-            self.frame_index_edit.setValidator(self.frame_range_validator)
-
-            self.update_filename_label()
-
+            self.init_navigation()
             self.load_images_local(self.urls[self.start_idx : self.end_idx])
 
+    def init_navigation(self):
+        """Point the slider, index box and labels at current_idx of a freshly loaded urls"""
+        last_idx = len(self.urls) - 1
+        # quietly, a value clamped by the new maximum or reset to current_idx would otherwise
+        # go through on_slider_value_changed and start loading frames of the new list
+        self.slider.blockSignals(True)
+        self.slider.setMaximum(last_idx)
+        self.slider.setValue(self.current_idx)
+        self.slider.blockSignals(False)
+        # the validator is already set on frame_index_edit, its range is enough
+        self.frame_range_validator.setTop(last_idx)
+        self.frame_index_edit.setText(str(self.current_idx))
+        self.frame_index_edit.setEnabled(True)
+        self.frame_index_edit.setVisible(True)
+        self.total_frames.setText("/  " + str(last_idx))
+        self.update_filename_label()
+
     def on_export_selected(self):
         self.save_path, _ = QFileDialog.getSaveFileName(
             self, "Select Export Location", os.curdir, "(*.zip)", **self.__file_dialog_kwargs__
@@ -640,54 +713,157 @@ class MainWindow(QMainWindow):
 
     def show_label_combobox(self):
         """Show a QComboBox with labels at the mouse position."""
-        combo = QComboBox(self)
-        labels = list(self.color_dict.keys())
-        combo.addItems(labels)
-        combo.setFixedWidth(150)  # Small window size
+        # created on first use and reused after, only its popup is ever shown
+        if self.label_combo is None:
+            self.label_combo = QComboBox(self)
+            self.label_combo.setModel(self.label_model)
+            self.label_combo.setFixedWidth(150)  # Small window size
+            self.label_combo.activated.connect(self._on_label_activated)
+        combo = self.label_combo
 
         # Position above the mouse cursor
         mouse_pos = self.mapFromGlobal(QPoint(self.cursor().pos()))
         combo.move(mouse_pos - QPoint(0, combo.height() + 5))  # 5px above mouse
         combo.showPopup()  # Show dropdown immediately
-        combo.activated.connect(lambda _: self.image_viewer.set_last_label(combo.currentText()))
+
+    def _on_label_activated(self, _index: int):
+        self.image_viewer.set_last_label(self.label_combo.currentText())
 
     def load_image_from_url(self, urls):
         """Start a thread to load an image from a URL."""
+        self.stop_loaders()
         self.async_remote_loader = AsyncRemoteImageLoader(
             urls, self.MAX_PARALLEL_REQUESTS, self.images
         )
-        self.loader_thread = QThread()
+        # owned by the window and Qt rather than the python references, a replaced loader is
+        # left to finish in the background and both go away with deleteLater
+        self.loader_thread = QThread(self)
+        sip.transferto(self.async_remote_loader, None)
         self.async_remote_loader.moveToThread(self.loader_thread)
-        self.async_remote_loader.image_loaded.connect(self.on_image_loaded)
-        self.async_remote_loader.error_occurred.connect(self.on_image_load_error)
+        self.async_remote_loader.image_loaded.connect(
+            self.on_image_loaded, Qt.ConnectionType.QueuedConnection
+        )
+        self.async_remote_loader.error_occurred.connect(
+            self.on_image_load_error, Qt.ConnectionType.QueuedConnection
+        )
         self.loader_thread.started.connect(self.async_remote_loader.run)
+        self.loader_thread.finished.connect(self.async_remote_loader.deleteLater)
         self.loader_thread.finished.connect(self.loader_thread.deleteLater)
 
         self.loader_thread.start()
 
+    def stop_loaders(self):
+        """Stop loading the current window, the slots it fills aren't read after a switch"""
+        if self.loader_thread is not None and self.async_remote_loader is not None:
+            # not waited on, in-flight fetches and their retries would hold up the GUI thread
+            self.async_remote_loader.stop()
+            self.loader_thread.quit()
+            self.loader_thread, self.async_remote_loader = None, None
+        if self.local_thread is not None:
+            # parented to the window below, it finishes and deletes itself in the background
+            self.local_thread.stop()
+            self.local_thread = None
+
     def stop_asyc_loader(self):
         if self.async_remote_loader:
             self.async_remote_loader.stop()
 
-    def on_image_loaded(self, url, image):
-        # self.images.append(image)
-        if self.current_image is None:
-            self.load_viewer(image)
+    def on_image_loaded(self, url, slot):
+        # loaders of a replaced window still report into their old list, which leaves ours empty
+        # (or shorter, slots are sized to the window)
+        if slot >= len(self.images) or self.images[slot] is None:
+            return
+        index = self.start_idx + slot
+        if index == self.pending_idx:
+            self.show_image(index)
+        elif -self.PREFETCH_BEHIND <= index - self.current_idx <= self.PREFETCH_AHEAD:
+            self.prefetch_image(index)
+
+    def show_image(self, index):
+        """Show image index with its annotations, or wait for it if it's still loading"""
+        # slots are filled from start_idx on, which isn't a multiple of MEMORY_LIMIT after a jump
+        image = self.images[index - self.start_idx]
+        if image is None:
+            self.pending_idx = index
+            return
+        self.pending_idx = None
+        # pixmaps of images shown before are kept in QPixmapCache, revisits skip the decode
+        pixmap = QPixmapCache.find(self.pixmap_cache_key(index))
+        if pixmap is not None:
+            self.load_viewer(image, pixmap)
+            self.load_annotations(index)
+            self.displayed_idx = index
+            self.prefetch_neighbours(index)
+            return
+        # decoded on the pool, the viewer is only touched once it's done
+        task = ImageDecodeTask(index, image)
+        task.signals.decoded.connect(self.on_image_decoded, Qt.ConnectionType.QueuedConnection)
+        QThreadPool.globalInstance().start(task)
+
+    def on_image_decoded(self, index, image, decoded):
+        # dropped if the user moved on, or to other files, while it was decoding
+        if index != self.current_idx or not (0 <= index - self.start_idx < len(self.images)):
+            return
+        if self.images[index - self.start_idx] is not image:
+            return
+        if decoded.isNull():
+            logger.error(f"Failed to decode image: {self.urls[index]}")
+            return
+        pixmap = QPixmap.fromImage(decoded)
+        QPixmapCache.insert(self.pixmap_cache_key(index), pixmap)
+        self.load_viewer(image, pixmap)
+        self.load_annotations(index)
+        self.displayed_idx = index
+        self.prefetch_neighbours(index)
+
+    def prefetch_neighbours(self, index):
+        """Decode the loaded frames around index so stepping to them is a QPixmapCache hit"""
+        for neighbour in range(index - self.PREFETCH_BEHIND, index + self.PREFETCH_AHEAD + 1):
+            self.prefetch_image(neighbour)
+
+    def prefetch_image(self, index):
+        slot = index - self.start_idx
+        if index == self.current_idx or index in self.prefetching:
+            return
+        if not 0 <= slot < len(self.images) or self.images[slot] is None:
+            return
+        if QPixmapCache.find(self.pixmap_cache_key(index)) is not None:
+            return
+        self.prefetching.add(index)
+        task = ImageDecodeTask(index, self.images[slot])
+        task.signals.decoded.connect(self.on_image_prefetched, Qt.ConnectionType.QueuedConnection)
+        QThreadPool.globalInstance().start(task)
+
+    def on_image_prefetched(self, index, image, decoded):
+        self.prefetching.discard(index)
+        # dropped if the window or the file list changed under it, same check as on_image_decoded
+        slot = index - self.start_idx
+        if not (0 <= slot < len(self.images)) or self.images[slot] is not image:
+            return
+        if not decoded.isNull():
+            QPixmapCache.insert(self.pixmap_cache_key(index), QPixmap.fromImage(decoded))
+
+    def pixmap_cache_key(self, index):
+        return f"samstudio-image:{self.urls[index]}"
 
     def on_image_load_error(self, url, error):
         logger.error(f"Failed to load image: {url} ; Error: {error}")
 
     def load_images_local(self, paths):
+        self.stop_loaders()
         self.local_thread = LocalImageLoader(paths, self.images)
-        self.local_thread.image_loaded.connect(self.load_viewer)
+        # owned by the window, not the python reference, so a replaced one can finish running
+        self.local_thread.setParent(self)
+        self.local_thread.finished.connect(self.local_thread.deleteLater)
+        self.local_thread.image_loaded.connect(
+            self.on_image_loaded, Qt.ConnectionType.QueuedConnection
+        )
         self.local_thread.start()
 
-    def load_viewer(self, image: bytes):
-        """Handle the loaded image by displaying it."""
+    def load_viewer(self, image: bytes, pixmap: QPixmap):
+        """Handle the loaded image by displaying it. pixmap is image decoded, see show_image"""
         self.image_viewer.setEnabled(False)
-        self.current_image = Image.open(io.BytesIO(image))
-        qimage = pil_to_qimage(self.current_image)
-        pixmap = QPixmap.fromImage(qimage)
+        self.current_image = image
         self.image_viewer.clear()
         self.object_list.clearSelection()
         self.object_list.clear()
@@ -711,13 +887,8 @@ class MainWindow(QMainWindow):
             # reset run_model action until embedding calculated
             self.run_model_action.setEnabled(False)
 
-            if (self.current_idx >= self.start_idx) and (self.current_idx < self.end_idx):
-                self.load_viewer(self.images[self.current_idx % MainWindow.MEMORY_LIMIT])
-            elif self.current_idx >= self.end_idx:
-                self.start_idx, self.end_idx = (
-                    self.current_idx,
-                    self.current_idx + MainWindow.MEMORY_LIMIT,
-                )
+            if self.current_idx >= self.end_idx:
+                self.set_image_window(self.current_idx)
                 if self.data_source == DataSource.LOCAL:
                     self.load_images_local(self.urls[self.start_idx : self.end_idx])
                 elif self.data_source == DataSource.URL_REQUEST:
@@ -725,20 +896,43 @@ class MainWindow(QMainWindow):
             elif self.current_idx < self.start_idx:
                 # for now do above
                 # TODO: change to loading from [current_idx, end_idx - (start_idx - current_idx)]
-                self.start_idx, self.end_idx = (
-                    self.current_idx,
-                    self.current_idx + MainWindow.MEMORY_LIMIT,
-                )
+                self.set_image_window(self.current_idx)
                 if self.data_source == DataSource.LOCAL:
                     self.load_images_local(self.urls[self.start_idx : self.end_idx])
                 elif self.data_source == DataSource.URL_REQUEST:
                     self.load_image_from_url(self.urls[self.start_idx : self.end_idx])
-            self.load_annotations(self.current_idx)
+            self.show_image(self.current_idx)
             return 0
         return 1
     
+    def set_image_window(self, start_idx):
+        """Move the loaded window to start at start_idx, one slot per image in it"""
+        self.start_idx = start_idx
+        # sized to what's left of urls, small lists don't get MEMORY_LIMIT slots
+        self.end_idx = min(start_idx + MainWindow.MEMORY_LIMIT, len(self.urls))
+        # fresh slots, the previous window's loader keeps writing into the old list
+        self.images = [None] * (self.end_idx - self.start_idx)
+        # their results no longer match any slot and get dropped, see on_image_prefetched
+        self.prefetching.clear()
+
+    def _on_slider_moved(self, _value: int):
+        self.scrub_timer.start()
+
+    def apply_slider_value(self):
+        self.scrub_timer.stop()
+        self.change_img_src(self.slider.value())
+
+    def on_slider_value_changed(self, value: int):
+        # setText doesn't fire editingFinished, so clicks/keys on the slider load from here
+        self.frame_index_edit.setText(str(value))
+        self.show_image_by_index(value)
+
+    def _on_frame_index_edited(self):
+        self.show_image_by_index(self.frame_index_edit.text())
+
     def show_image_by_index(self, text: Union[str,int]) -> None:
-        if text != "":
+        # the index box follows the slider while it's dragged, scrub_timer does the loading then
+        if text != "" and not self.slider.isSliderDown():
             ret = self.change_img_src(int(text))
             if ret == 0:
                 self.slider.setValue(self.current_idx)
@@ -770,6 +964,10 @@ class MainWindow(QMainWindow):
         else:
             self.filename_label.setText("No file loaded")
 
+    def on_viewer_object_selected(self, mask_data: MaskData):
+        """Remember the polygon picked in the viewer as the source for copy/paste"""
+        self.edit_hook.update_state(action=None, state=None, obj=mask_data)
+
     def handle_copy(self):
         self.edit_hook.copy()
 
@@ -800,8 +998,13 @@ class MainWindow(QMainWindow):
         masks: list[MaskData] = self.image_viewer.add_prediction_polys(
             list(map(lambda candidates: candidates[0], candid_polys))
         )
-        for idx, mask in enumerate(masks):
-            self.add_candid_preds(mask, candid_polys[idx])
+        # one relayout/repaint of the list for the whole batch instead of one per item
+        self.object_list.setUpdatesEnabled(False)
+        try:
+            for idx, mask in enumerate(masks):
+                self.add_candid_preds(mask, candid_polys[idx])
+        finally:
+            self.object_list.setUpdatesEnabled(True)
 
         self.image_viewer.clear_prompts()
 
@@ -813,10 +1016,10 @@ class MainWindow(QMainWindow):
         self.image_viewer.changePolygonLabel(item.data(Qt.ItemDataRole.UserRole).id, label_text)
         if item:
             item.data(Qt.ItemDataRole.UserRole).label = label_text
-            item.setBackground(QColor(*self.color_dict[label_text] + (50,)))
+            item.setBackground(self.fill_color_dict[label_text])
 
     def add_to_object_list(self, shape_dict: MaskData, total_candidates=0):
-        custom_widget = CustomListItemWidget(list(self.color_dict.keys()))
+        custom_widget = CustomListItemWidget(label_model=self.label_model)
 
         custom_widget.setupFields(
             shape_dict.id,
@@ -831,7 +1034,7 @@ class MainWindow(QMainWindow):
         item.setSizeHint(custom_widget.sizeHint())
 
         # item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-        item.setBackground(QColor(*self.color_dict[shape_dict.label] + (50,)))
+        item.setBackground(self.fill_color_dict[shape_dict.label])
         self.object_list.addItem(item)
         custom_widget.deleted.connect(partial(self.delete_object, item))
         # custom_widget.visibility_changed.connect(lambda i:)
@@ -855,6 +1058,20 @@ class MainWindow(QMainWindow):
         self.id_to_candids[mask_obj.id] = candidate_polys
         object_item.candidate_changed.connect(self.on_candidate_changed)
 
+    def schedule_object_selected(self, index):
+        """
+        Arrow keys through the object list change the row faster than the viewer repaints,
+        only the last row selected before control gets back to the event loop is highlighted
+        """
+        if self.pending_selected_row is None:
+            QTimer.singleShot(0, self.apply_object_selected)
+        self.pending_selected_row = index
+
+    def apply_object_selected(self):
+        index, self.pending_selected_row = self.pending_selected_row, None
+        if index is not None:
+            self.on_object_selected(index)
+
     def on_object_selected(self, index):
         """Highlight the selected object's polygon."""
         if index == -1:
@@ -899,8 +1116,12 @@ class MainWindow(QMainWindow):
         self.control_list.setCurrentRow(control.value.real)
 
     def save_annotations(self):
+        # current_idx may already point at an image that's still decoding, what's on screen
+        # belongs to displayed_idx
+        if self.displayed_idx is None:
+            return
         objects = []
-        image_url = self.urls[self.current_idx]
+        image_url = self.urls[self.displayed_idx]
         for i in range(self.object_list.count()):
             logger.debug(f"Number of objects in object_list: {self.object_list.count()}")
             row = self.object_list.item(i)
@@ -910,7 +1131,7 @@ class MainWindow(QMainWindow):
                 mask_data = row.data(Qt.ItemDataRole.UserRole)
                 # polygon = self.image_viewer.id_to_poly[id].polygon()
                 polygon = self.image_viewer.id_to_poly[mask_data.id].polygon()
-                polygon_points = [[p.x(), p.y()] for p in polygon]
+                polygon_points = qpolygon_to_points(polygon).tolist()
                 objects.append(
                     {
                         "id": mask_data.id,
@@ -927,7 +1148,7 @@ class MainWindow(QMainWindow):
         if anno:
             mask_data_list = [
                 MaskData(
-                    mask_id=obj["id"],
+                    id=obj["id"],
                     points=obj["polygon"],
                     label=obj["label"],
                     center=obj["center"] if "center" in obj else None,
@@ -935,8 +1156,12 @@ class MainWindow(QMainWindow):
                 for obj in anno["objects"]
             ]
             self.image_viewer.display_polygons(mask_data_list)
-            for mask_data in mask_data_list:
-                _ = self.add_to_object_list(mask_data)
+            self.object_list.setUpdatesEnabled(False)
+            try:
+                for mask_data in mask_data_list:
+                    _ = self.add_to_object_list(mask_data)
+            finally:
+                self.object_list.setUpdatesEnabled(True)
 
     def keyPressEvent(self, a0: Optional[QKeyEvent]) -> None:
         if a0 is not None:
@@ -975,9 +1200,11 @@ class MainWindow(QMainWindow):
             self.status_label.setText('<span style="color:#1E90FF;">🔄 Checking API connection...</span>')
             self.trigger_check_connection.emit()
             if self.current_image is not None and self.image_viewer.isEnabled():
-                self.trigger_embbeding()
+                # current_image is the encoded bytes the embed endpoint takes
+                self.trigger_embbeding.emit(self.current_image)
 
     def close(self):
-        if self.model_thread.isRunning:
+        # model_thread is only built once the event loop runs, see __init__
+        if hasattr(self, "model_thread") and self.model_thread.isRunning:
             self.model_thread.exit()
         return super().close()
\ No newline at end of file
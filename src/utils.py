@@ -1,12 +1,12 @@
 from enum import Enum
+from functools import lru_cache
 import logging
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import os
 from dataclasses import dataclass
 
-from PyQt6.QtGui import QColor, QIcon, QPixmap, QPainter
-from PyQt6.QtCore import QRectF, Qt, QSize, QRect, QPoint
-from PIL import ImageQt
+from PyQt6.QtGui import QColor, QIcon, QPixmap, QPixmapCache, QPainter, QPolygonF
+from PyQt6.QtCore import QRectF, Qt, QSize, QRect, QPoint, QPointF
 from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
 
 from PyQt6.QtSvg import QSvgRenderer
@@ -61,24 +61,29 @@ class ModelPrompts(Enum):
     TEXT = 2
 
 
-@dataclass
+@dataclass(eq=False)
 class MaskData(object):
     """
     Mask information data class(poly or box)
-    mask_id: int
+    id: int
         Unique id for the mask()
-    points: list[list[int]]
-        List of [x,y] coordinates
-    label: int
-        label id
+    points: np.ndarray
+        (N, 2) float32 array of [x,y] coordinates
+    label: str
+        label name
     center: (x,y)
     """
 
-    def __init__(self, mask_id: int, points: list, label, center):
-        self.id = mask_id
-        self.points = points
-        self.label = label
-        self.center = center
+    # slots declared by hand (no field defaults) to stay compatible with python 3.8
+    __slots__ = ("id", "points", "label", "center")
+
+    id: int
+    points: np.ndarray
+    label: str
+    center: Optional[QPointF]
+
+    def __post_init__(self):
+        self.points = np.asarray(self.points, dtype=np.float32).reshape(-1, 2)
 
 
 class ShapeDelegate(QStyledItemDelegate):
@@ -131,21 +136,47 @@ def get_logger(name: Optional[str] = None):
     return logger
 
 
-def pil_to_qimage(pil_image):
-    """Convert a PIL Image to a QImage."""
-    qt_image = ImageQt.ImageQt(pil_image)
-    return qt_image
+def points_to_qpolygon(points) -> QPolygonF:
+    """Build a QPolygonF from an (N, 2) array of [x,y] coordinates."""
+    return QPolygonF([QPointF(x, y) for x, y in np.asarray(points, dtype=np.float64).tolist()])
+
+
+def qpolygon_to_points(polygon: QPolygonF) -> np.ndarray:
+    """(N, 2) float64 array of a QPolygonF's vertices, read straight from its point buffer."""
+    if polygon.isEmpty():
+        return np.empty((0, 2), dtype=np.float64)
+    buffer = polygon.data()
+    buffer.setsize(polygon.size() * 2 * 8)  # QPointF is two qreal (double)
+    # copied so the array doesn't point into the polygon's memory
+    return np.frombuffer(buffer, dtype=np.float64).reshape(-1, 2).copy()
 
 
 def gray_out_icon(icon):
-    """Convert an icon to a grayed-out version."""
-    pixmap = icon.pixmap(48, 48, QIcon.Mode.Disabled)
+    """
+    Convert an icon to a grayed-out version. The disabled rendering is kept in QPixmapCache
+    under the icon's cache key, switching modes back and forth doesn't redo it.
+    """
+    key = f"samstudio-gray:{icon.cacheKey()}"
+    pixmap = QPixmapCache.find(key)
+    if pixmap is None:
+        pixmap = icon.pixmap(48, 48, QIcon.Mode.Disabled)
+        QPixmapCache.insert(key, pixmap)
     return QIcon(pixmap)
 
 
+# colors file path --> ((st_mtime_ns, st_size), color dict), reused while the file is unchanged
+_COLORS_CACHE: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+
+
 def read_colors(text_file):
+    path = os.environ["HOME"] + "/" + text_file
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _COLORS_CACHE.get(path)
+    if cached is not None and cached[0] == stamp:
+        return dict(cached[1])
     color_dict = {}
-    with open(os.environ["HOME"] + "/" + text_file, "r") as f:
+    with open(path, "r") as f:
         for line in f:
             line_cols = line.strip().split(" ")
             color_dict[" ".join(line_cols[3:])] = (
@@ -153,11 +184,14 @@ def read_colors(text_file):
                 int(line_cols[1]),
                 int(line_cols[2]),
             )
-    return color_dict
+    _COLORS_CACHE[path] = (stamp, color_dict)
+    # values are tuples, a shallow copy is enough to keep the cached one intact
+    return dict(color_dict)
 
 
+@lru_cache(maxsize=32)
 def svg_to_icon(svg_string, size):
-    """Convert an SVG string to a QIcon."""
+    """Convert an SVG string to a QIcon. Rendered once per (svg, size), QIcons share fine."""
     renderer = QSvgRenderer(bytearray(svg_string.encode("utf-8")))
     pixmap = QPixmap(size, size)
     pixmap.fill(Qt.GlobalColor.transparent)
@@ -176,20 +210,60 @@ def is_inside_rect(rect: QRectF, point: QPoint):
     return True
 
 
+def clip_polygon(points: np.ndarray, rect: QRectF) -> np.ndarray:
+    """
+    Clip a polygon against an axis aligned rect(Sutherland-Hodgman).
+    points: (N, 2) array of [x,y] vertices
+    Returns the clipped (M, 2) float32 array, empty if nothing is left inside.
+    """
+    pts = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    x_min, y_min, x_max, y_max = rect.getCoords()
+    # (axis, bound, sign): a vertex is inside when coord * sign <= bound * sign
+    for axis, bound, sign in ((0, x_min, -1), (0, x_max, 1), (1, y_min, -1), (1, y_max, 1)):
+        if len(pts) == 0:
+            break
+        nxt = np.roll(pts, -1, axis=0)
+        inside = pts[:, axis] * sign <= bound * sign
+        nxt_inside = np.roll(inside, -1)
+        crossing = inside != nxt_inside
+        # intersection of every crossing edge (pts[i] -> nxt[i]) with the clip line
+        delta = nxt[:, axis] - pts[:, axis]
+        t = np.divide(bound - pts[:, axis], delta, out=np.zeros_like(delta), where=crossing)
+        intersections = pts + t[:, None] * (nxt - pts)
+        intersections[:, axis] = bound
+        # per edge emit the intersection if it crosses, then the end vertex if it is inside
+        candidates = np.stack((intersections, nxt), axis=1)
+        keep = np.stack((crossing, nxt_inside), axis=1)
+        pts = candidates[keep]
+    if len(pts):
+        # vertices landing on the clip lines get emitted twice, drop the repeats
+        unique = np.any(pts != np.roll(pts, 1, axis=0), axis=1)
+        unique[0] |= not unique.any()
+        pts = pts[unique]
+    return pts
+
+
 def get_convex_hull(pred_img: np.ndarray, bg_value: int = 0, k=6) -> np.ndarray:
-    pred_cumsum = pred_img[pred_img.any(1)].cumsum(axis=1)
-    start_y = pred_img[pred_img.any(1)].argmax(axis=1)
-    end_y = pred_cumsum.argmax(axis=1)
-    xs = np.where(pred_img.any(1, keepdims=False))[0]
+    # rows with any foreground, reduced once and shared by the lookups below
+    rows = pred_img.any(1)
+    fg_rows = pred_img[rows]
+    start_y = fg_rows.argmax(axis=1)
+    # last foreground column, argmax on the reversed view instead of a full cumsum copy
+    end_y = fg_rows.shape[1] - 1 - fg_rows[:, ::-1].argmax(axis=1)
+    xs = np.flatnonzero(rows)
     # xs, ys = np.apply_along_axis(get_first_last_occurrence, 1, pred_img)
     # xs, ys = np.where(pred_img != bg_value)
-    indices = list(zip(np.concatenate((xs, xs)), np.concatenate((start_y, end_y))))
+    # (x, start) pairs then (x, end) pairs, written straight into the array smallest_kgon takes
+    indices = np.empty((2 * len(xs), 2), dtype=np.float32)
+    indices[:, 0] = np.concatenate((xs, xs))
+    indices[: len(xs), 1] = start_y
+    indices[len(xs) :, 1] = end_y
     # from scipy.spatial import ConvexHull
     import smallest_kgon as s_kgon
 
     # hull_indices = ConvexHull(np.array(indices)).vertices
     # convex_hull = np.array([indices[i] for i in hull_indices])
-    hull_points = s_kgon.smallest_kgon(np.array(indices).astype(np.float32), k=k)
+    hull_points = s_kgon.smallest_kgon(indices, k=k)
     return hull_points
 
 
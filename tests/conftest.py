@@ -0,0 +1,26 @@
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QApplication
+
+
+@pytest.fixture(scope="session")
+def app():
+    # one for the whole run, widgets need a QApplication and Qt allows only one
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def wait_until(app):
+    def wait(condition, timeout_ms=5000):
+        """Run the event loop until condition() holds, fail once timeout_ms has passed"""
+        deadline = time.monotonic() + timeout_ms / 1000
+        while not condition():
+            assert time.monotonic() < deadline, "timed out waiting for the condition"
+            QTest.qWait(10)
+
+    return wait
@@ -0,0 +1,47 @@
+import pytest
+from PyQt6.QtCore import QPoint, QPointF, Qt
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtTest import QTest
+
+from src.image_viewer import ImageViewer
+from src.utils import ControlItem, MaskData
+
+
+@pytest.fixture
+def viewer(app):
+    viewer = ImageViewer({"background": (0, 0, 0), "car": (255, 0, 0)})
+    viewer.resize(200, 200)
+    viewer.set_image(QPixmap(100, 100))
+    viewer.set_mode("manual")
+    mask = MaskData(id=1, points=[[20, 20], [80, 20], [80, 80], [20, 80]], label="car", center=None)
+    viewer.display_polygons([mask])
+    yield viewer
+    viewer.deleteLater()
+
+
+def test_hovering_a_polygon_selects_it(viewer):
+    selected = []
+    viewer.object_selected.connect(selected.append)
+    viewer._handle_move(QPointF(50, 50), QPoint(0, 0))
+    assert [mask.id for mask in selected] == [1]
+    assert viewer.shaded_poly is viewer.id_to_poly[1]
+
+
+def test_ctrl_click_starts_dragging_the_polygon(viewer):
+    viewer.key_control_pressed = True
+    click_pos = viewer.mapFromScene(QPointF(50, 50))
+    QTest.mousePress(viewer.viewport(), Qt.MouseButton.LeftButton, pos=click_pos)
+    assert viewer.dragging_polygon is viewer.id_to_poly[1]
+
+
+def test_polygon_clipped_away_still_ends_drawing(viewer):
+    controls = []
+    viewer.control_change.connect(controls.append)
+    viewer.current_control = ControlItem.POLYGON
+    viewer.temp_points = [QPointF(150, 150), QPointF(180, 150), QPointF(180, 180)]
+    QTest.keyClick(viewer, Qt.Key.Key_N)
+    assert viewer.temp_points == []
+    assert viewer.id_to_poly.keys() == {1}
+    assert viewer.current_control == ControlItem.NORMAL
+    assert viewer.prev_shape == ControlItem.POLYGON
+    assert controls == [ControlItem.NORMAL]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+# the vendored predictor builds on the sam2 package's modeling code and configs
+pytest.importorskip("sam2")
+
+from src.models.sam2.build_sam import build_sam2
+from src.models.sam2.sam2_image_predictor import SAM2ImagePredictor
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    torch.manual_seed(0)
+    # untrained weights do, the masks only have to match each other
+    model = build_sam2("configs/sam2.1/sam2.1_hiera_t.yaml", ckpt_path=None, device="cpu")
+    return SAM2ImagePredictor(model)
+
+
+def predict_masks(predictor):
+    masks, _, _ = predictor.predict(
+        point_coords=np.array([[20, 15]], dtype=np.float32),
+        point_labels=np.ones(1, dtype=np.int32),
+    )
+    return masks
+
+
+def test_restored_image_state_predicts_like_set_image(predictor):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+    other = rng.integers(0, 256, (32, 32, 3), dtype=np.uint8)
+
+    predictor.set_image(image)
+    state = predictor.get_image_state()
+    # what a cache hit does after another image was embedded in between
+    predictor.set_image(other)
+    predictor.set_image_state(state)
+    restored = predict_masks(predictor)
+
+    predictor.set_image(image)
+    np.testing.assert_array_equal(restored, predict_masks(predictor))
@@ -0,0 +1,84 @@
+import pytest
+import requests
+
+from src.sam_thread import RequestWorker
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.body = body
+
+    def json(self):
+        if self.body is None:
+            raise ValueError("no json body")
+        return self.body
+
+
+@pytest.fixture
+def worker(app):
+    worker = RequestWorker("http://localhost:1/")
+    worker.failures, worker.predictions = [], []
+    worker.connection_failed.connect(worker.failures.append)
+    worker.prediction_ready.connect(worker.predictions.append)
+    return worker
+
+
+@pytest.mark.parametrize(
+    "outcome",
+    [requests.exceptions.ConnectionError("refused"), FakeResponse(503), FakeResponse(200)],
+)
+def test_failed_predict_is_reported_not_raised(worker, monkeypatch, outcome):
+    def post(url, **kwargs):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(worker.session, "post", post)
+    worker.predict("image", "", [[[1, 2, 1]]], [])
+    worker._flush_predicts()
+    assert worker.predictions == []
+    assert len(worker.failures) == 1
+
+
+def test_predict_batch_emits_each_prediction(worker, monkeypatch):
+    body = {"predictions": [[[[0, 0]]], [[[1, 1]]]]}
+    monkeypatch.setattr(worker.session, "post", lambda url, **kwargs: FakeResponse(200, body))
+    worker.predict("image", "", [[[1, 2, 1]]], [])
+    worker.predict("image", "", [[[3, 4, 1]]], [])
+    worker._flush_predicts()
+    assert worker.predictions == body["predictions"]
+    assert worker.failures == []
+
+
+def fire_probe_timer(worker):
+    # what the retry timer does when it runs out, without waiting for it
+    worker._probe_timer.stop()
+    worker._probe_connection()
+
+
+def test_loading_server_is_polled_until_ready(worker, monkeypatch):
+    responses = [FakeResponse(200, {"model_status": "Loading"})] * 20
+    responses.append(FakeResponse(200, {"model_status": "Loaded"}))
+    monkeypatch.setattr(worker.session, "get", lambda url, **kwargs: responses.pop(0))
+    ready = []
+    worker.connection_ok.connect(ready.append)
+    worker.check_connection()
+    while responses:
+        assert worker._probe_timer.interval() <= max(RequestWorker.CONNECTION_RETRY_DELAYS_MS)
+        fire_probe_timer(worker)
+    assert ready == ["Ready"]
+    assert worker.failures == []
+
+
+def test_unreachable_server_gives_up(worker, monkeypatch):
+    def get(url, **kwargs):
+        raise requests.exceptions.ConnectionError("refused")
+
+    monkeypatch.setattr(worker.session, "get", get)
+    worker.check_connection()
+    while worker._probe_timer.isActive():
+        fire_probe_timer(worker)
+    assert worker.failures == ["refused"]
+    assert worker._unreachable_probes == len(RequestWorker.CONNECTION_RETRY_DELAYS_MS) + 1
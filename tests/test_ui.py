@@ -0,0 +1,91 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+from PIL import Image
+from PyQt6.QtCore import QPointF
+from PyQt6.QtGui import QPixmapCache
+
+import src.ui as ui
+from src.utils import MaskData
+
+
+@pytest.fixture
+def window(app, monkeypatch, wait_until):
+    # the configured label colors file lives outside the repo
+    colors = {"background": (0, 0, 0), "car": (255, 0, 0)}
+    monkeypatch.setattr(ui, "read_colors", lambda path: colors)
+    window = ui.MainWindow()
+    # the model thread is started from the event loop, it has to be running to be stopped below
+    wait_until(lambda: hasattr(window, "model_thread") and window.model_thread.isRunning())
+    yield window
+    window.stop_loaders()
+    window.close()
+    window.model_thread.wait()
+    window.deleteLater()
+
+
+def test_viewer_object_selected_updates_edit_hook(window):
+    mask = MaskData(id=1, points=np.zeros((3, 2)), label="car", center=QPointF(0, 0))
+    window.image_viewer.object_selected.emit(mask)
+    assert window.edit_hook.state_dict["last_object"] is mask
+
+
+def test_quick_navigation_keeps_annotations_on_their_image(window, tmp_path, wait_until):
+    for i in range(3):
+        Image.new("RGB", (64, 48), (i * 80, 0, 0)).save(tmp_path / f"{i}.png")
+    window.urls = [str(tmp_path / f"{i}.png") for i in range(3)]
+    window.current_idx, window.pending_idx = 0, 0
+    window.set_image_window(0)
+    window.init_navigation()
+    window.load_images_local(window.urls[window.start_idx : window.end_idx])
+    wait_until(lambda: window.displayed_idx == 0)
+
+    mask = MaskData(id=1, points=[[1, 1], [10, 1], [10, 10]], label="car", center=QPointF(5, 5))
+    window.add_to_object_list(mask)
+    window.image_viewer.display_polygons([mask])
+    # nothing prefetched, so the second step happens before image 1's decode lands
+    QPixmapCache.clear()
+    window.go_forward()
+    window.go_forward()
+    wait_until(lambda: window.displayed_idx == 2)
+
+    assert [obj["id"] for obj in window.annotations[window.urls[0]]["objects"]] == [1]
+    assert window.annotations.get(window.urls[1], {"objects": []})["objects"] == []
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    requested = threading.Event()
+
+    def do_GET(self):
+        self.requested.set()
+        time.sleep(1)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"not an image")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_stopping_remote_loader_does_not_wait_for_fetches(window, wait_until):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/"
+        window.urls = [f"{url}{i}.png" for i in range(4)]
+        window.set_image_window(0)
+        window.load_image_from_url(window.urls)
+        wait_until(SlowHandler.requested.is_set)
+        thread = window.loader_thread
+        start = time.perf_counter()
+        window.stop_loaders()
+        assert time.perf_counter() - start < 0.5
+        # left to finish on its own and delete itself
+        finished = []
+        thread.finished.connect(lambda: finished.append(True))
+        wait_until(lambda: finished)
+    finally:
+        server.shutdown()